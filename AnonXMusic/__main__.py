@@ -7,9 +7,21 @@ from pytgcalls.exceptions import NoActiveGroupCall
 import config
 from AnonXMusic import LOGGER, app, userbot
 from AnonXMusic.core.call import Anony
+from AnonXMusic.core.http import close_session
 from AnonXMusic.misc import sudo
 from AnonXMusic.plugins import ALL_MODULES
-from AnonXMusic.utils.database import get_banned_users, get_gbanned
+from AnonXMusic.utils.database import (
+    iter_banned_users,
+    iter_gbanned,
+    preload_settings,
+)
+from AnonXMusic.utils.indexes import ensure_indexes
+from AnonXMusic.utils.stream.mediastore import mediastore
+from AnonXMusic.utils.stream.probe import probe
+from AnonXMusic.utils.stream.variants import speedvariants
+from AnonXMusic.utils.thumbnails import renderer, thumbcache
+from AnonXMusic.utils.writebehind import writes
+from AnonXMusic.utils.ytdlp import ytdlp
 from config import BANNED_USERS
 
 async def init():
@@ -22,16 +34,21 @@ async def init():
     ):
         LOGGER(__name__).error("Assistant client variables not defined, exiting...")
         exit()
+    renderer.start()
+    indexes = asyncio.create_task(ensure_indexes())
+    preload = asyncio.create_task(preload_settings())
     await sudo()
     try:
-        users = await get_gbanned()
-        for user_id in users:
+        async for user_id in iter_gbanned():
             BANNED_USERS.add(user_id)
-        users = await get_banned_users()
-        for user_id in users:
+        async for user_id in iter_banned_users():
             BANNED_USERS.add(user_id)
     except:
         pass
+    mediastore.scan()
+    probe.load()
+    speedvariants.scan()
+    await thumbcache.load()
     await app.start()
     for all_module in ALL_MODULES:
         importlib.import_module("AnonXMusic.plugins" + all_module)
@@ -49,8 +66,17 @@ async def init():
         pass
 
     await Anony.decorators()
+    loaded, took = await preload
+    LOGGER("AnonXMusic").info(f"Preloaded {loaded} chat settings in {took:.2f}s.")
+    LOGGER("AnonXMusic").info(f"Ensured {await indexes} database indexes.")
     await idle()
     await app.stop()
+    await close_session()
+    await writes.close()
+    await probe.save()
+    ytdlp.shutdown()
+    renderer.shutdown()
+    speedvariants.shutdown()
     LOGGER("AnonXMusic").info("Stopping AnonX Music Bot...")
 
 
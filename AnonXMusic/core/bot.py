@@ -1,3 +1,5 @@
+import os
+
 from pyrogram import Client, errors
 from pyrogram.enums import ChatMemberStatus, ParseMode
 
@@ -50,5 +52,27 @@ class Anony(Client):
             exit()
         LOGGER(__name__).info(f"Music Bot Started as {self.name}")
 
+    async def send_photo(self, chat_id, photo, *args, **kwargs):
+        # Thumbnails that were uploaded before are sent by their file_id.
+        from AnonXMusic.utils.stream.mediastore import media_id
+        from AnonXMusic.utils.thumbnails import get_thumb, thumbcache
+
+        file_id = thumbcache.file_id(photo)
+        if file_id:
+            try:
+                return await super().send_photo(chat_id, file_id, *args, **kwargs)
+            except (
+                errors.FileIdInvalid,
+                errors.FileReferenceExpired,
+                errors.FileReferenceInvalid,
+                errors.MediaEmpty,
+            ):
+                thumbcache.forget(photo)
+                if not os.path.isfile(photo):
+                    photo = await get_thumb(media_id(photo), force_update=True)
+        message = await super().send_photo(chat_id, photo, *args, **kwargs)
+        thumbcache.remember(photo, message)
+        return message
+
     async def stop(self):
         await super().stop()
@@ -1,6 +1,5 @@
 import asyncio
 import os
-from datetime import datetime, timedelta
 from typing import Union
 
 from pyrogram import Client
@@ -14,6 +13,7 @@ from pytgcalls.types import Update, StreamEnded
 from pytgcalls import filters as fl
 from pytgcalls.types import AudioQuality, VideoQuality
 from pytgcalls.types import MediaStream,ChatUpdate
+from pytgcalls.types import GroupCallParticipant, UpdatedGroupCallParticipant
 
 import config
 from config import autoclean
@@ -22,9 +22,12 @@ from AnonXMusic.misc import db
 from AnonXMusic.utils.database import (
     add_active_chat,
     add_active_video_chat,
+    get_assistant_number,
+    get_client,
     get_lang,
     get_loop,
     group_assistant,
+    is_active_chat,
     is_autoend,
     music_on,
     remove_active_chat,
@@ -32,20 +35,41 @@ from AnonXMusic.utils.database import (
     set_loop,
 )
 from AnonXMusic.utils.exceptions import AssistantErr
-from AnonXMusic.utils.formatters import check_duration, seconds_to_min, speed_converter
+from AnonXMusic.utils.formatters import (
+    seconds_to_min,
+    tempo_parameters,
+    tempo_position,
+    time_to_seconds,
+)
 from AnonXMusic.utils.inline.play import stream_markup
+from AnonXMusic.utils.scheduler import scheduler
+from AnonXMusic.utils.stream import clock
+from AnonXMusic.utils.stream.prefetch import prefetch, take_prefetched
+from AnonXMusic.utils.stream.probe import probe
+from AnonXMusic.utils.stream.variants import speedvariants
 from AnonXMusic.utils.thumbnails import get_thumb
 from strings import get_string
 from AnonXMusic.platforms.Youtube import cookie_txt_file
 
-autoend = {}
+# chat_id -> people in the videochat, tracked while auto end is on
 counter = {}
+# Chats the assistants never leave on their own.
+STAY_IN = [config.LOGGER_ID, -1001580005596, -1001866745564]
 
 
 async def _clear_(chat_id):
     db[chat_id] = []
     await remove_active_video_chat(chat_id)
     await remove_active_chat(chat_id)
+    counter.pop(chat_id, None)
+    scheduler.cancel(("autoend", chat_id))
+    if config.AUTO_LEAVING_ASSISTANT:
+        scheduler.schedule(
+            ("autoleave", chat_id),
+            config.ASSISTANT_LEAVE_TIME,
+            Anony.auto_leave,
+            chat_id,
+        )
 
 
 class Call(PyTgCalls):
@@ -150,57 +174,42 @@ class Call(PyTgCalls):
 
     async def speedup_stream(self, chat_id: int, file_path, speed, playing):
         assistant = await group_assistant(self, chat_id)
-        if str(speed) != str("1.0"):
-            base = os.path.basename(file_path)
-            chatdir = os.path.join(os.getcwd(), "playback", str(speed))
-            if not os.path.isdir(chatdir):
-                os.makedirs(chatdir)
-            out = os.path.join(chatdir, base)
-            if not os.path.isfile(out):
-                if str(speed) == str("0.5"):
-                    vs = 2.0
-                if str(speed) == str("0.75"):
-                    vs = 1.35
-                if str(speed) == str("1.5"):
-                    vs = 0.68
-                if str(speed) == str("2.0"):
-                    vs = 0.5
-                proc = await asyncio.create_subprocess_shell(
-                    cmd=(
-                        "ffmpeg "
-                        "-i "
-                        f"{file_path} "
-                        "-filter:v "
-                        f"setpts={vs}*PTS "
-                        "-filter:a "
-                        f"atempo={speed} "
-                        f"{out}"
-                    ),
-                    stdin=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                await proc.communicate()
-            else:
-                pass
-        else:
+        source_seconds = playing[0].get("old_second") or playing[0]["seconds"]
+        # Position in the original track, then in the track at the new speed.
+        position = tempo_position(
+            clock.played(playing[0]), 1.0, playing[0].get("speed") or 1.0
+        )
+        con_seconds = tempo_position(position, speed)
+        render = None
+        if str(speed) == str("1.0"):
             out = file_path
-        dur = await asyncio.get_event_loop().run_in_executor(None, check_duration, out)
-        dur = int(dur)
-        played, con_seconds = speed_converter(playing[0]["played"], speed)
+            dur = int(await probe.duration(out) or source_seconds)
+            parameters = tempo_parameters(position, dur)
+        elif config.SPEED_MODE == "live":
+            out = file_path
+            dur = int(tempo_position(source_seconds, speed))
+            parameters = tempo_parameters(con_seconds, dur, speed)
+        else:
+            out, dur, render = await speedvariants.get(
+                file_path, str(speed), con_seconds, int(source_seconds / float(speed))
+            )
+            parameters = tempo_parameters(con_seconds, dur)
+            if render:
+                # A variant still being rendered is followed as it grows.
+                parameters = f"-follow 1 -rw_timeout 30000000 {parameters}"
         duration = seconds_to_min(dur)
         stream = (
             MediaStream(
                 out,
                 audio_parameters=AudioQuality.HIGH,
                 video_parameters=VideoQuality.SD_480p,
-                ffmpeg_parameters=f"-ss {played} -to {duration}",
-
+                ffmpeg_parameters=parameters,
             )
             if playing[0]["streamtype"] == "video"
             else MediaStream(
                 out,
                 audio_parameters=AudioQuality.HIGH,
-                ffmpeg_parameters=f"-ss {played} -to {duration}",
+                ffmpeg_parameters=parameters,
                 video_flags=MediaStream.Flags.IGNORE
             )
         )
@@ -213,11 +222,43 @@ class Call(PyTgCalls):
             if not exis:
                 db[chat_id][0]["old_dur"] = db[chat_id][0]["dur"]
                 db[chat_id][0]["old_second"] = db[chat_id][0]["seconds"]
-            db[chat_id][0]["played"] = con_seconds
+            if not os.path.isfile(out):
+                out = speedvariants.path(file_path, str(speed))
+            clock.seek(db[chat_id][0], con_seconds)
             db[chat_id][0]["dur"] = duration
             db[chat_id][0]["seconds"] = dur
-            db[chat_id][0]["speed_path"] = out
+            db[chat_id][0]["speed_path"] = None if out == file_path else out
             db[chat_id][0]["speed"] = speed
+            if render:
+                asyncio.create_task(
+                    self.finish_render(chat_id, file_path, speed, render)
+                )
+
+    async def finish_render(self, chat_id: int, file_path, speed, render):
+        # The partial file is played up to an estimated duration, and a
+        # finished or failed render would leave the player waiting at its
+        # end. Move the chat to the finished variant, or to live tempo on the
+        # original file, at the current position.
+        await render.wait()
+        check = db.get(chat_id)
+        if not check or check[0].get("speed_path") not in (render.part, render.output):
+            return
+        entry = check[0]
+        position = clock.played(entry)
+        if render.finished:
+            out, dur, stream_speed = render.output, int(render.rendered), 1.0
+        else:
+            out, dur, stream_speed = file_path, int(entry["seconds"]), speed
+        try:
+            await self.seek_stream(
+                chat_id, out, position, dur, entry["streamtype"], stream_speed
+            )
+        except:
+            return
+        entry["dur"] = seconds_to_min(dur)
+        entry["seconds"] = dur
+        entry["speed_path"] = out if render.finished else None
+        clock.seek(entry, position)
 
     async def force_stop_stream(self, chat_id: int):
         assistant = await group_assistant(self, chat_id)
@@ -253,22 +294,28 @@ class Call(PyTgCalls):
             chat_id,
             stream,
         )
+        # Count playback from the moment the new track actually plays.
+        if db.get(chat_id):
+            clock.start(db[chat_id][0])
 
-    async def seek_stream(self, chat_id, file_path, to_seek, duration, mode):
+    async def seek_stream(self, chat_id, file_path, to_seek, duration, mode, speed=1.0):
         assistant = await group_assistant(self, chat_id)
+        parameters = tempo_parameters(
+            time_to_seconds(to_seek), time_to_seconds(duration), speed
+        )
         stream = (
             MediaStream(
                 file_path,
                 audio_parameters=AudioQuality.HIGH,
                 video_parameters=VideoQuality.SD_480p,
-                ffmpeg_parameters=f"-ss {to_seek} -to {duration}",
+                ffmpeg_parameters=parameters,
             )
             if mode == "video"
             else MediaStream(
                 file_path,
                 audio_parameters=AudioQuality.HIGH,
                 video_flags=MediaStream.Flags.IGNORE,
-                ffmpeg_parameters=f"-ss {to_seek} -to {duration}",
+                ffmpeg_parameters=parameters,
             )
         )
         await assistant.play(chat_id, stream)
@@ -334,11 +381,49 @@ class Call(PyTgCalls):
         await music_on(chat_id)
         if video:
             await add_active_video_chat(chat_id)
+        scheduler.cancel(("autoleave", chat_id))
         if await is_autoend():
-            counter[chat_id] = {}
-            users = len(await assistant.get_participants(chat_id))
-            if users == 1:
-                autoend[chat_id] = datetime.now() + timedelta(minutes=1)
+            counter[chat_id] = len(await assistant.get_participants(chat_id))
+            if counter[chat_id] == 1:
+                scheduler.schedule(("autoend", chat_id), 60, self.auto_end, chat_id)
+
+    async def participants_changed(self, chat_id: int, joined: bool):
+        if chat_id not in counter:
+            return
+        counter[chat_id] += 1 if joined else -1
+        if counter[chat_id] <= 1:
+            if not scheduler.pending(("autoend", chat_id)):
+                scheduler.schedule(("autoend", chat_id), 60, self.auto_end, chat_id)
+        else:
+            scheduler.cancel(("autoend", chat_id))
+
+    async def auto_end(self, chat_id: int):
+        if not await is_autoend() or not await is_active_chat(chat_id):
+            return
+        try:
+            await self.stop_stream(chat_id)
+        except:
+            return
+        try:
+            await app.send_message(
+                chat_id,
+                "» ʙᴏᴛ ᴀᴜᴛᴏᴍᴀᴛɪᴄᴀʟʟʏ ʟᴇғᴛ ᴠɪᴅᴇᴏᴄʜᴀᴛ ʙᴇᴄᴀᴜsᴇ ɴᴏ ᴏɴᴇ ᴡᴀs ʟɪsᴛᴇɴɪɴɢ ᴏɴ ᴠɪᴅᴇᴏᴄʜᴀᴛ.",
+            )
+        except:
+            pass
+
+    async def auto_leave(self, chat_id: int, client=None):
+        if chat_id in STAY_IN or await is_active_chat(chat_id):
+            return
+        if not client:
+            assistant = await get_assistant_number(chat_id)
+            if not assistant:
+                return
+            client = await get_client(assistant)
+        try:
+            await client.leave_chat(chat_id)
+        except:
+            pass
 
     async def change_stream(self, client, chat_id):
         check = db.get(chat_id)
@@ -372,7 +457,6 @@ class Call(PyTgCalls):
             original_chat_id = check[0]["chat_id"]
             streamtype = check[0]["streamtype"]
             videoid = check[0]["vidid"]
-            db[chat_id][0]["played"] = 0
             exis = (check[0]).get("old_dur")
             if exis:
                 db[chat_id][0]["dur"] = exis
@@ -380,6 +464,7 @@ class Call(PyTgCalls):
                 db[chat_id][0]["speed_path"] = None
                 db[chat_id][0]["speed"] = 1.0
             video = True if str(streamtype) == "video" else False
+            prefetch(chat_id)
             if "live_" in queued:
                 n, link = await YouTube.video(videoid, True)
                 if n == 0:
@@ -406,6 +491,7 @@ class Call(PyTgCalls):
                         original_chat_id,
                         text=_["call_6"],
                     )
+                clock.start(check[0])
                 img = await get_thumb(videoid,user_id)
                 button = stream_markup(_, chat_id)
                 run = await app.send_photo(
@@ -422,18 +508,21 @@ class Call(PyTgCalls):
                 db[chat_id][0]["mystic"] = run
                 db[chat_id][0]["markup"] = "tg"
             elif "vid_" in queued:
-                mystic = await app.send_message(original_chat_id, _["call_7"])
-                try:
-                    file_path, direct = await YouTube.download(
-                        videoid,
-                        mystic,
-                        videoid=True,
-                        video=True if str(streamtype) == "video" else False,
-                    )
-                except:
-                    return await mystic.edit_text(
-                        _["call_6"], disable_web_page_preview=True
-                    )
+                mystic = None
+                file_path = take_prefetched(check[0])
+                if not file_path:
+                    mystic = await app.send_message(original_chat_id, _["call_7"])
+                    try:
+                        file_path, direct = await YouTube.download(
+                            videoid,
+                            mystic,
+                            videoid=True,
+                            video=True if str(streamtype) == "video" else False,
+                        )
+                    except:
+                        return await mystic.edit_text(
+                            _["call_6"], disable_web_page_preview=True
+                        )
                 if video:
                     stream = MediaStream(
                         file_path,
@@ -453,9 +542,11 @@ class Call(PyTgCalls):
                         original_chat_id,
                         text=_["call_6"],
                     )
+                clock.start(check[0])
                 img = await get_thumb(videoid,user_id)
                 button = stream_markup(_, chat_id)
-                await mystic.delete()
+                if mystic:
+                    await mystic.delete()
                 run = await app.send_photo(
                     chat_id=original_chat_id,
                     photo=img,
@@ -486,6 +577,7 @@ class Call(PyTgCalls):
                         original_chat_id,
                         text=_["call_6"],
                     )
+                clock.start(check[0])
                 button = stream_markup(_, chat_id)
                 run = await app.send_photo(
                     chat_id=original_chat_id,
@@ -515,6 +607,7 @@ class Call(PyTgCalls):
                         original_chat_id,
                         text=_["call_6"],
                     )
+                clock.start(check[0])
                 if videoid == "telegram":
                     button = stream_markup(_, chat_id)
                     run = await app.send_photo(
@@ -627,5 +720,20 @@ class Call(PyTgCalls):
         async def stream_end_handler1(client:PyTgCalls, update: StreamEnded):
             await self.change_stream(client, update.chat_id)
 
+        participant_filter = fl.call_participant(
+            GroupCallParticipant.Action.JOINED | GroupCallParticipant.Action.LEFT
+        )
+
+        @self.one.on_update(participant_filter)
+        @self.two.on_update(participant_filter)
+        @self.three.on_update(participant_filter)
+        @self.four.on_update(participant_filter)
+        @self.five.on_update(participant_filter)
+        async def participants_change_handler(client, update: UpdatedGroupCallParticipant):
+            await self.participants_changed(
+                update.chat_id,
+                update.participant.action == GroupCallParticipant.Action.JOINED,
+            )
+
 
 Anony = Call()
@@ -0,0 +1,34 @@
+import aiohttp
+
+import config
+
+from ..logging import LOGGER
+
+_session = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=config.HTTP_CONNECTION_LIMIT,
+            limit_per_host=config.HTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=config.HTTP_TIMEOUT,
+            sock_connect=config.HTTP_CONNECT_TIMEOUT,
+        )
+        _session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        LOGGER(__name__).info("HTTP Client Session Created.")
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+        LOGGER(__name__).info("HTTP Client Session Closed.")
+    _session = None
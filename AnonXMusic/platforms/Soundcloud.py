@@ -1,7 +1,8 @@
 from os import path
-from yt_dlp import YoutubeDL
 
 from AnonXMusic.utils.formatters import seconds_to_min
+from AnonXMusic.utils.stream.mediastore import mediastore
+from AnonXMusic.utils.ytdlp import ytdlp
 
 
 class SoundAPI:
@@ -21,12 +22,12 @@ class SoundAPI:
             return False
 
     async def download(self, url):
-        d = YoutubeDL(self.opts)
         try:
-            info = d.extract_info(url)
+            info = await ytdlp.extract_info(self.opts, url, download=True)
         except:
             return False
         xyz = path.join("downloads", f"{info['id']}.{info['ext']}")
+        mediastore.add(xyz)
         duration_min = seconds_to_min(info["duration"])
         track_details = {
             "title": info["title"],
@@ -8,11 +8,12 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Voice
 import config
 from AnonXMusic import app
 from AnonXMusic.utils.formatters import (
-    check_duration,
     convert_bytes,
     get_readable_time,
     seconds_to_min,
 )
+from AnonXMusic.utils.stream.mediastore import mediastore
+from AnonXMusic.utils.stream.probe import probe
 
 
 class TeleAPI:
@@ -54,10 +55,7 @@ class TeleAPI:
             dur = seconds_to_min(filex.duration)
         except:
             try:
-                dur = await asyncio.get_event_loop().run_in_executor(
-                    None, check_duration, file_path
-                )
-                dur = seconds_to_min(dur)
+                dur = seconds_to_min(int(await probe.duration(file_path)))
             except:
                 return "Unknown"
         return dur
@@ -96,7 +94,7 @@ class TeleAPI:
         higher = [5, 10, 20, 40, 66, 80, 99]
         checker = [5, 10, 20, 40, 66, 80, 99]
         speed_counter = {}
-        if os.path.exists(fname):
+        if mediastore.find([fname]):
             return True
 
         async def down_load():
@@ -173,4 +171,5 @@ class TeleAPI:
         if not verify:
             return False
         config.lyrical.pop(mystic.id)
+        mediastore.add(fname)
         return True
@@ -2,14 +2,17 @@ import asyncio
 import os
 import re
 import json
+import time
 from typing import Union
 import requests
-import yt_dlp
 from pyrogram.enums import MessageEntityType
 from pyrogram.types import Message
 from youtubesearchpython.__future__ import VideosSearch
 from AnonXMusic.utils.database import is_on_off
 from AnonXMusic.utils.formatters import time_to_seconds
+from AnonXMusic.utils.metadata import metacache
+from AnonXMusic.utils.stream.mediastore import mediastore
+from AnonXMusic.utils.ytdlp import ytdlp
 import os
 import glob
 import random
@@ -17,143 +20,180 @@ import logging
 import aiohttp
 import config
 from config import API_URL, VIDEO_API_URL, API_KEY
+from AnonXMusic.core.http import get_session
+from AnonXMusic.utils.cookies import cookies
 
 
 def cookie_txt_file():
-    cookie_dir = f"{os.getcwd()}/cookies"
-    if not os.path.exists(cookie_dir):
-        return None
-    cookies_files = [f for f in os.listdir(cookie_dir) if f.endswith(".txt")]
-    if not cookies_files:
-        return None
-    cookie_file = os.path.join(cookie_dir, random.choice(cookies_files))
-    return cookie_file
+    return cookies.pick()
+
+
+# In-flight downloads keyed by (video_id, kind, format). Concurrent callers for
+# the same key await one shared task instead of starting their own download.
+_inflight = {}
+
+
+async def single_flight(key, factory):
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield so that one cancelled waiter does not cancel the shared download
+    return await asyncio.shield(task)
+
+
+async def fetch_to_file(session, url: str, file_path: str):
+    # Write to a temp name and rename once complete, so a half-written file
+    # is never picked up by the exists() checks or handed to join_call.
+    temp_path = f"{file_path}.part"
+    try:
+        async with session.get(url) as file_response:
+            with open(temp_path, 'wb') as f:
+                while True:
+                    chunk = await file_response.content.read(8192)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        os.replace(temp_path, file_path)
+        mediastore.add(file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return file_path
+
+
+# Status polling of the song/video API: start with short intervals, back off
+# exponentially with jitter, and give up after a deadline scaled to the track.
+POLL_INITIAL = 0.5
+POLL_FACTOR = 1.6
+POLL_MAX = 8
+# min, max, seconds per second of track, used when the duration is unknown
+AUDIO_DEADLINE = (30, 240, 0.2, 60)
+VIDEO_DEADLINE = (60, 480, 0.5, 120)
+
+
+def api_deadline(video_id: str, video: bool = False) -> float:
+    low, high, rate, default = VIDEO_DEADLINE if video else AUDIO_DEADLINE
+    record = metacache.peek(video_id)
+    try:
+        seconds = time_to_seconds(record["duration"])
+    except:
+        return default
+    return min(high, max(low, low / 2 + seconds * rate))
+
+
+async def poll_api(session, url: str, deadline: float):
+    """Poll the API until the file is ready; None if the deadline passes first."""
+    delay = POLL_INITIAL
+    end = time.monotonic() + deadline
+    while True:
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise Exception(f"API request failed with status code {response.status}")
+            data = await response.json()
+        status = data.get("status", "").lower()
+        if status == "done":
+            if not data.get("link"):
+                raise Exception("API response did not provide a download URL.")
+            return data
+        elif status != "downloading":
+            error_msg = data.get("error") or data.get("message") or f"Unexpected status '{status}'"
+            raise Exception(f"API error: {error_msg}")
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            return None
+        await asyncio.sleep(min(delay * random.uniform(0.75, 1.25), remaining))
+        delay = min(delay * POLL_FACTOR, POLL_MAX)
 
 
 async def download_song(link: str):
     video_id = link.split('v=')[-1].split('&')[0]
 
     download_folder = "downloads"
-    for ext in ["mp3", "m4a", "webm"]:
-        file_path = f"{download_folder}/{video_id}.{ext}"
-        if os.path.exists(file_path):
-            #print(f"File already exists: {file_path}")
-            return file_path
-        
-    song_url = f"{API_URL}/song/{video_id}?api={API_KEY}"
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(10):
-            try:
-                async with session.get(song_url) as response:
-                    if response.status != 200:
-                        raise Exception(f"API request failed with status code {response.status}")
-                
-                    data = await response.json()
-                    status = data.get("status", "").lower()
+    file_path = mediastore.find(
+        f"{download_folder}/{video_id}.{ext}" for ext in ["mp3", "m4a", "webm"]
+    )
+    if file_path:
+        return file_path
 
-                    if status == "done":
-                        download_url = data.get("link")
-                        if not download_url:
-                            raise Exception("API response did not provide a download URL.")
-                        break
-                    elif status == "downloading":
-                        await asyncio.sleep(4)
-                    else:
-                        error_msg = data.get("error") or data.get("message") or f"Unexpected status '{status}'"
-                        raise Exception(f"API error: {error_msg}")
-            except Exception as e:
-                print(f"[FAIL] {e}")
-                return None
-        else:
-            print("⏱️ Max retries reached. Still downloading...")
-            return None
-    
+    return await single_flight((video_id, "audio", "api"), lambda: _download_song(video_id))
 
-        try:
-            file_format = data.get("format", "mp3")
-            file_extension = file_format.lower()
-            file_name = f"{video_id}.{file_extension}"
-            download_folder = "downloads"
-            os.makedirs(download_folder, exist_ok=True)
-            file_path = os.path.join(download_folder, file_name)
-
-            async with session.get(download_url) as file_response:
-                with open(file_path, 'wb') as f:
-                    while True:
-                        chunk = await file_response.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                return file_path
-        except aiohttp.ClientError as e:
-            print(f"Network or client error occurred while downloading: {e}")
-            return None
-        except Exception as e:
-            print(f"Error occurred while downloading song: {e}")
-            return None
-    return None
+
+async def _download_song(video_id: str):
+    song_url = f"{API_URL}/song/{video_id}?api={API_KEY}"
+    session = get_session()
+    try:
+        data = await poll_api(
+            session, song_url, api_deadline(video_id, video=False)
+        )
+    except Exception as e:
+        print(f"[FAIL] {e}")
+        return None
+    if not data:
+        print("⏱️ Deadline reached. Still downloading...")
+        return None
+    download_url = data["link"]
+
+    try:
+        file_format = data.get("format", "mp3")
+        file_extension = file_format.lower()
+        file_name = f"{video_id}.{file_extension}"
+        download_folder = "downloads"
+        os.makedirs(download_folder, exist_ok=True)
+        file_path = os.path.join(download_folder, file_name)
+
+        return await fetch_to_file(session, download_url, file_path)
+    except aiohttp.ClientError as e:
+        print(f"Network or client error occurred while downloading: {e}")
+        return None
+    except Exception as e:
+        print(f"Error occurred while downloading song: {e}")
+        return None
 
 async def download_video(link: str):
     video_id = link.split('v=')[-1].split('&')[0]
 
     download_folder = "downloads"
-    for ext in ["mp4", "webm", "mkv"]:
-        file_path = f"{download_folder}/{video_id}.{ext}"
-        if os.path.exists(file_path):
-            return file_path
-        
-    video_url = f"{VIDEO_API_URL}/video/{video_id}?api={API_KEY}"
-    async with aiohttp.ClientSession() as session:
-        for attempt in range(10):
-            try:
-                async with session.get(video_url) as response:
-                    if response.status != 200:
-                        raise Exception(f"API request failed with status code {response.status}")
-                
-                    data = await response.json()
-                    status = data.get("status", "").lower()
+    file_path = mediastore.find(
+        f"{download_folder}/{video_id}.{ext}" for ext in ["mp4", "webm", "mkv"]
+    )
+    if file_path:
+        return file_path
 
-                    if status == "done":
-                        download_url = data.get("link")
-                        if not download_url:
-                            raise Exception("API response did not provide a download URL.")
-                        break
-                    elif status == "downloading":
-                        await asyncio.sleep(8)
-                    else:
-                        error_msg = data.get("error") or data.get("message") or f"Unexpected status '{status}'"
-                        raise Exception(f"API error: {error_msg}")
-            except Exception as e:
-                print(f"[FAIL] {e}")
-                return None
-        else:
-            print("⏱️ Max retries reached. Still downloading...")
-            return None
-    
+    return await single_flight((video_id, "video", "api"), lambda: _download_video(video_id))
 
-        try:
-            file_format = data.get("format", "mp4")
-            file_extension = file_format.lower()
-            file_name = f"{video_id}.{file_extension}"
-            download_folder = "downloads"
-            os.makedirs(download_folder, exist_ok=True)
-            file_path = os.path.join(download_folder, file_name)
-
-            async with session.get(download_url) as file_response:
-                with open(file_path, 'wb') as f:
-                    while True:
-                        chunk = await file_response.content.read(8192)
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                return file_path
-        except aiohttp.ClientError as e:
-            print(f"Network or client error occurred while downloading: {e}")
-            return None
-        except Exception as e:
-            print(f"Error occurred while downloading video: {e}")
-            return None
-    return None
+
+async def _download_video(video_id: str):
+    video_url = f"{VIDEO_API_URL}/video/{video_id}?api={API_KEY}"
+    session = get_session()
+    try:
+        data = await poll_api(
+            session, video_url, api_deadline(video_id, video=True)
+        )
+    except Exception as e:
+        print(f"[FAIL] {e}")
+        return None
+    if not data:
+        print("⏱️ Deadline reached. Still downloading...")
+        return None
+    download_url = data["link"]
+
+    try:
+        file_format = data.get("format", "mp4")
+        file_extension = file_format.lower()
+        file_name = f"{video_id}.{file_extension}"
+        download_folder = "downloads"
+        os.makedirs(download_folder, exist_ok=True)
+        file_path = os.path.join(download_folder, file_name)
+
+        return await fetch_to_file(session, download_url, file_path)
+    except aiohttp.ClientError as e:
+        print(f"Network or client error occurred while downloading: {e}")
+        return None
+    except Exception as e:
+        print(f"Error occurred while downloading video: {e}")
+        return None
 
 async def check_file_size(link):
     async def get_format_info(link):
@@ -162,15 +202,17 @@ async def check_file_size(link):
             print("No cookies found. Cannot check file size.")
             return None
             
-        proc = await asyncio.create_subprocess_exec(
-            "yt-dlp",
-            "--cookies", cookie_file,
-            "-J",
-            link,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await proc.communicate()
+        with cookies.track(cookie_file) as used:
+            proc = await asyncio.create_subprocess_exec(
+                "yt-dlp",
+                "--cookies", cookie_file,
+                "-J",
+                link,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await proc.communicate()
+            used["ok"] = proc.returncode == 0
         if proc.returncode != 0:
             print(f'Error:\n{stderr.decode()}')
             return None
@@ -217,6 +259,8 @@ class YouTubeAPI:
         self.status = "https://www.youtube.com/oembed?url="
         self.listbase = "https://youtube.com/playlist?list="
         self.reg = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+        self.urls = {}
+        self.background = set()
 
     async def exists(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
@@ -250,13 +294,19 @@ class YouTubeAPI:
             return None
         return text[offset : offset + length]
 
+    async def search(self, link: str, limit: int = 1) -> list:
+        results = await metacache.get(link, limit)
+        if results is None:
+            results = (await VideosSearch(link, limit=limit).next())["result"]
+            metacache.put(link, limit, results)
+        return results
+
     async def details(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             title = result["title"]
             duration_min = result["duration"]
             thumbnail = result["thumbnails"][0]["url"].split("?")[0]
@@ -272,8 +322,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             title = result["title"]
         return title
 
@@ -282,8 +331,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             duration = result["duration"]
         return duration
 
@@ -292,8 +340,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             thumbnail = result["thumbnails"][0]["url"].split("?")[0]
         return thumbnail
 
@@ -316,22 +363,61 @@ class YouTubeAPI:
         if not cookie_file:
             return 0, "No cookies found. Cannot download video."
             
-        proc = await asyncio.create_subprocess_exec(
-            "yt-dlp",
-            "--cookies", cookie_file,
-            "-g",
-            "-f",
-            "best[height<=?720][width<=?1280]",
-            f"{link}",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await proc.communicate()
+        with cookies.track(cookie_file) as used:
+            proc = await asyncio.create_subprocess_exec(
+                "yt-dlp",
+                "--cookies", cookie_file,
+                "-g",
+                "-f",
+                "best[height<=?720][width<=?1280]",
+                f"{link}",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout, stderr = await proc.communicate()
+            used["ok"] = bool(stdout)
         if stdout:
             return 1, stdout.decode().split("\n")[0]
         else:
             return 0, stderr.decode()
 
+    def local_file(self, videoid: str, video: Union[bool, str] = None):
+        exts = ["mp4", "webm", "mkv"] if video else ["mp3", "m4a", "webm"]
+        return mediastore.find(f"downloads/{videoid}.{ext}" for ext in exts)
+
+    async def stream_url(self, link: str, video: Union[bool, str] = None):
+        """Resolve a direct media url, reused until shortly before it expires."""
+        key = (link, bool(video))
+        now = time.time()
+        cached = self.urls.get(key)
+        if cached and cached[1] > now:
+            return cached[0]
+        ytdl_opts = {
+            "format": "best[height<=?720][width<=?1280]" if video else "bestaudio/best",
+            "geo_bypass": True,
+            "nocheckcertificate": True,
+            "quiet": True,
+            "no_warnings": True,
+        }
+        cookie_file = cookie_txt_file()
+        if cookie_file:
+            ytdl_opts["cookiefile"] = cookie_file
+        try:
+            with cookies.track(cookie_file):
+                info = await ytdlp.extract_info(ytdl_opts, link)
+        except Exception as e:
+            print(f"Stream url resolution failed: {e}")
+            return None
+        url = info.get("url")
+        if not url:
+            return None
+        expire = re.search(r"[?&]expire=(\d+)", url)
+        expiry = int(expire.group(1)) - 60 if expire else now + config.STREAM_URL_TTL
+        for k in [k for k, v in self.urls.items() if v[1] <= now]:
+            self.urls.pop(k, None)
+        self.urls[key] = (url, expiry)
+        return url
+
     async def playlist(self, link, limit, user_id, videoid: Union[bool, str] = None):
         if videoid:
             link = self.listbase + link
@@ -342,9 +428,12 @@ class YouTubeAPI:
         if not cookie_file:
             return []
             
-        playlist = await shell_cmd(
-            f"yt-dlp -i --get-id --flat-playlist --cookies {cookie_file} --playlist-end {limit} --skip-download {link}"
-        )
+        with cookies.track(cookie_file) as used:
+            playlist = await shell_cmd(
+                f"yt-dlp -i --get-id --flat-playlist --cookies {cookie_file} --playlist-end {limit} --skip-download {link}"
+            )
+            # shell_cmd hands back yt-dlp's errors in place of the ids
+            used["ok"] = bool(playlist.strip()) and "ERROR:" not in playlist
         try:
             result = playlist.split("\n")
             for key in result:
@@ -359,8 +448,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             title = result["title"]
             duration_min = result["duration"]
             vidid = result["id"]
@@ -386,34 +474,33 @@ class YouTubeAPI:
             return [], link
             
         ytdl_opts = {"quiet": True, "cookiefile" : cookie_file}
-        ydl = yt_dlp.YoutubeDL(ytdl_opts)
-        with ydl:
-            formats_available = []
-            r = ydl.extract_info(link, download=False)
-            for format in r["formats"]:
+        formats_available = []
+        with cookies.track(cookie_file):
+            r = await ytdlp.extract_info(ytdl_opts, link)
+        for format in r["formats"]:
+            try:
+                str(format["format"])
+            except:
+                continue
+            if not "dash" in str(format["format"]).lower():
                 try:
-                    str(format["format"])
+                    format["format"]
+                    format["filesize"]
+                    format["format_id"]
+                    format["ext"]
+                    format["format_note"]
                 except:
                     continue
-                if not "dash" in str(format["format"]).lower():
-                    try:
-                        format["format"]
-                        format["filesize"]
-                        format["format_id"]
-                        format["ext"]
-                        format["format_note"]
-                    except:
-                        continue
-                    formats_available.append(
-                        {
-                            "format": format["format"],
-                            "filesize": format["filesize"],
-                            "format_id": format["format_id"],
-                            "ext": format["ext"],
-                            "format_note": format["format_note"],
-                            "yturl": link,
-                        }
-                    )
+                formats_available.append(
+                    {
+                        "format": format["format"],
+                        "filesize": format["filesize"],
+                        "format_id": format["format_id"],
+                        "ext": format["ext"],
+                        "format_note": format["format_note"],
+                        "yturl": link,
+                    }
+                )
         return formats_available, link
 
     async def slider(
@@ -426,8 +513,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        a = VideosSearch(link, limit=10)
-        result = (await a.next()).get("result")
+        result = await self.search(link, limit=10)
         title = result[query_type]["title"]
         duration_min = result[query_type]["duration"]
         vidid = result[query_type]["id"]
@@ -444,11 +530,11 @@ class YouTubeAPI:
         songvideo: Union[bool, str] = None,
         format_id: Union[bool, str] = None,
         title: Union[bool, str] = None,
+        stream: Union[bool, str] = True,
     ) -> str:
         if videoid:
             link = self.base + link
-        loop = asyncio.get_running_loop()
-        def audio_dl():
+        async def audio_dl():
             cookie_file = cookie_txt_file()
             if not cookie_file:
                 raise Exception("No cookies found. Cannot download audio.")
@@ -462,15 +548,16 @@ class YouTubeAPI:
                 "cookiefile" : cookie_file,
                 "no_warnings": True,
             }
-            x = yt_dlp.YoutubeDL(ydl_optssx)
-            info = x.extract_info(link, False)
-            xyz = os.path.join("downloads", f"{info['id']}.{info['ext']}")
-            if os.path.exists(xyz):
-                return xyz
-            x.download([link])
+            with cookies.track(cookie_file):
+                info = await ytdlp.extract_info(ydl_optssx, link)
+                xyz = os.path.join("downloads", f"{info['id']}.{info['ext']}")
+                if mediastore.find([xyz]):
+                    return xyz
+                await ytdlp.download(ydl_optssx, [link])
+            mediastore.add(xyz)
             return xyz
 
-        def video_dl():
+        async def video_dl():
             cookie_file = cookie_txt_file()
             if not cookie_file:
                 raise Exception("No cookies found. Cannot download video.")
@@ -484,15 +571,16 @@ class YouTubeAPI:
                 "cookiefile" : cookie_file,
                 "no_warnings": True,
             }
-            x = yt_dlp.YoutubeDL(ydl_optssx)
-            info = x.extract_info(link, False)
-            xyz = os.path.join("downloads", f"{info['id']}.{info['ext']}")
-            if os.path.exists(xyz):
-                return xyz
-            x.download([link])
+            with cookies.track(cookie_file):
+                info = await ytdlp.extract_info(ydl_optssx, link)
+                xyz = os.path.join("downloads", f"{info['id']}.{info['ext']}")
+                if mediastore.find([xyz]):
+                    return xyz
+                await ytdlp.download(ydl_optssx, [link])
+            mediastore.add(xyz)
             return xyz
 
-        def song_video_dl():
+        async def song_video_dl():
             cookie_file = cookie_txt_file()
             if not cookie_file:
                 raise Exception("No cookies found. Cannot download song video.")
@@ -510,10 +598,10 @@ class YouTubeAPI:
                 "prefer_ffmpeg": True,
                 "merge_output_format": "mp4",
             }
-            x = yt_dlp.YoutubeDL(ydl_optssx)
-            x.download([link])
+            with cookies.track(cookie_file):
+                await ytdlp.download(ydl_optssx, [link])
 
-        def song_audio_dl():
+        async def song_audio_dl():
             cookie_file = cookie_txt_file()
             if not cookie_file:
                 raise Exception("No cookies found. Cannot download song audio.")
@@ -536,8 +624,8 @@ class YouTubeAPI:
                     }
                 ],
             }
-            x = yt_dlp.YoutubeDL(ydl_optssx)
-            x.download([link])
+            with cookies.track(cookie_file):
+                await ytdlp.download(ydl_optssx, [link])
 
         if songvideo:
             await download_song(link)
@@ -567,17 +655,19 @@ class YouTubeAPI:
                 direct = True
                 downloaded_file = await download_song(link)
             else:
-                proc = await asyncio.create_subprocess_exec(
-                    "yt-dlp",
-                    "--cookies", cookie_file,
-                    "-g",
-                    "-f",
-                    "best[height<=?720][width<=?1280]",
-                    f"{link}",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout, stderr = await proc.communicate()
+                with cookies.track(cookie_file) as used:
+                    proc = await asyncio.create_subprocess_exec(
+                        "yt-dlp",
+                        "--cookies", cookie_file,
+                        "-g",
+                        "-f",
+                        "best[height<=?720][width<=?1280]",
+                        f"{link}",
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                    )
+                    stdout, stderr = await proc.communicate()
+                    used["ok"] = bool(stdout)
                 if stdout:
                     downloaded_file = stdout.decode().split("\n")[0]
                     direct = False
@@ -591,8 +681,25 @@ class YouTubeAPI:
                      print(f"File size {total_size_mb:.2f} MB exceeds the 100MB limit.")
                      return None, None
                    direct = True
-                   downloaded_file = await loop.run_in_executor(None, video_dl)
+                   downloaded_file = await single_flight(
+                       (link.split("v=")[-1].split("&")[0], "video", "720p"),
+                       video_dl,
+                   )
         else:
             direct = True
+            # stream=False waits for the file, e.g. for prefetching.
+            if config.DIRECT_STREAM and stream:
+                video_id = link.split("v=")[-1].split("&")[0]
+                downloaded_file = self.local_file(video_id)
+                if downloaded_file:
+                    return downloaded_file, direct
+                # Start playback from the media url; the finished download is
+                # picked up by seeks and later plays of the same track.
+                url = await self.stream_url(link)
+                if url:
+                    task = asyncio.create_task(download_song(link))
+                    self.background.add(task)
+                    task.add_done_callback(self.background.discard)
+                    return url, False
             downloaded_file = await download_song(link)
         return downloaded_file, direct
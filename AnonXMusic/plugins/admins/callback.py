@@ -20,6 +20,8 @@ from AnonXMusic.utils.database import (
 from AnonXMusic.utils.decorators.language import languageCB
 from AnonXMusic.utils.formatters import seconds_to_min
 from AnonXMusic.utils.inline import close_markup, stream_markup, stream_markup_timer
+from AnonXMusic.utils.stream import clock
+from AnonXMusic.utils.stream.prefetch import prefetch, take_prefetched
 from AnonXMusic.utils.thumbnails import get_thumb
 from config import (
     BANNED_USERS,
@@ -206,13 +208,13 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
         streamtype = check[0]["streamtype"]
         videoid = check[0]["vidid"]
         status = True if str(streamtype) == "video" else None
-        db[chat_id][0]["played"] = 0
         exis = (check[0]).get("old_dur")
         if exis:
             db[chat_id][0]["dur"] = exis
             db[chat_id][0]["seconds"] = check[0]["old_second"]
             db[chat_id][0]["speed_path"] = None
             db[chat_id][0]["speed"] = 1.0
+        prefetch(chat_id)
         if "live_" in queued:
             n, link = await YouTube.video(videoid, True)
             if n == 0:
@@ -247,15 +249,17 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
             mystic = await CallbackQuery.message.reply_text(
                 _["call_7"], disable_web_page_preview=True
             )
-            try:
-                file_path, direct = await YouTube.download(
-                    videoid,
-                    mystic,
-                    videoid=True,
-                    video=status,
-                )
-            except:
-                return await mystic.edit_text(_["call_6"])
+            file_path = take_prefetched(check[0])
+            if not file_path:
+                try:
+                    file_path, direct = await YouTube.download(
+                        videoid,
+                        mystic,
+                        videoid=True,
+                        video=status,
+                    )
+                except:
+                    return await mystic.edit_text(_["call_6"])
             try:
                 image = await YouTube.thumbnail(videoid, True)
             except:
@@ -384,7 +388,7 @@ async def markup_timer():
                     buttons = stream_markup_timer(
                         _,
                         chat_id,
-                        seconds_to_min(playing[0]["played"]),
+                        seconds_to_min(clock.played(playing[0])),
                         playing[0]["dur"],
                     )
                     await mystic.edit_reply_markup(
@@ -6,6 +6,7 @@ from AnonXMusic.core.call import Anony
 from AnonXMusic.misc import db
 from AnonXMusic.utils import AdminRightsCheck, seconds_to_min
 from AnonXMusic.utils.inline import close_markup
+from AnonXMusic.utils.stream import clock
 from config import BANNED_USERS
 
 
@@ -28,7 +29,7 @@ async def seek_comm(cli, message: Message, _, chat_id):
     if duration_seconds == 0:
         return await message.reply_text(_["admin_22"])
     file_path = playing[0]["file"]
-    duration_played = int(playing[0]["played"])
+    duration_played = clock.played(playing[0])
     duration_to_skip = int(query)
     duration = playing[0]["dur"]
     if message.command[0][-2] == "c":
@@ -47,12 +48,19 @@ async def seek_comm(cli, message: Message, _, chat_id):
         to_seek = duration_played + duration_to_skip + 1
     mystic = await message.reply_text(_["admin_24"])
     if "vid_" in file_path:
-        n, file_path = await YouTube.video(playing[0]["vidid"], True)
-        if n == 0:
-            return await message.reply_text(_["admin_22"])
+        file_path = playing[0].get("prefetched") or YouTube.local_file(
+            playing[0]["vidid"], playing[0]["streamtype"] == "video"
+        )
+        if not file_path:
+            n, file_path = await YouTube.video(playing[0]["vidid"], True)
+            if n == 0:
+                return await message.reply_text(_["admin_22"])
+    # Speed variants are played as they are, otherwise the tempo is applied live.
+    speed = playing[0].get("speed") or 1.0
     check = (playing[0]).get("speed_path")
     if check:
         file_path = check
+        speed = 1.0
     if "index_" in file_path:
         file_path = playing[0]["vidid"]
     try:
@@ -62,13 +70,14 @@ async def seek_comm(cli, message: Message, _, chat_id):
             seconds_to_min(to_seek),
             duration,
             playing[0]["streamtype"],
+            speed,
         )
     except:
         return await mystic.edit_text(_["admin_26"], reply_markup=close_markup(_))
     if message.command[0][-2] == "c":
-        db[chat_id][0]["played"] -= duration_to_skip
+        clock.seek(db[chat_id][0], duration_played - duration_to_skip)
     else:
-        db[chat_id][0]["played"] += duration_to_skip
+        clock.seek(db[chat_id][0], duration_played + duration_to_skip)
     await mystic.edit_text(
         text=_["admin_25"].format(seconds_to_min(to_seek), message.from_user.mention),
         reply_markup=close_markup(_),
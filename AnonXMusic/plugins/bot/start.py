@@ -8,18 +8,17 @@ from pyrogram.enums import ChatType
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 from pyrogram.errors.exceptions.not_acceptable_406 import ChannelPrivate
 from pyrogram.errors.exceptions.flood_420 import SlowmodeWait
-from ytSearch import VideosSearch
 
 import config
-from AnonXMusic import app
+from AnonXMusic import YouTube, app
 from AnonXMusic.misc import _boot_
 from AnonXMusic.plugins.sudo.sudoers import sudoers_list
 from AnonXMusic.utils.database import (
     add_served_chat,
     add_served_user,
-    blacklisted_chats,
     get_lang,
     is_banned_user,
+    is_blacklisted_chat,
     is_on_off,
     blacklist_chat,
 )
@@ -56,8 +55,7 @@ async def start_pm(client, message: Message, _):
             m = await message.reply_text("🔎")
             query = (str(name)).replace("info_", "", 1)
             query = f"https://www.youtube.com/watch?v={query}"
-            results = VideosSearch(query, limit=1)
-            for result in (await results.next())["result"]:
+            for result in await YouTube.search(query):
                 title = result["title"]
                 duration = result["duration"]
                 views = result["viewCount"]["short"]
@@ -146,7 +144,7 @@ async def welcome(client, message: Message):
                 if message.chat.type != ChatType.SUPERGROUP:
                     await message.reply_text(_["start_4"])
                     return await app.leave_chat(message.chat.id)
-                if message.chat.id in await blacklisted_chats():
+                if await is_blacklisted_chat(message.chat.id):
                     await message.reply_text(
                         _["start_5"].format(
                             app.mention,
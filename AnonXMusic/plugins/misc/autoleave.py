@@ -1,72 +1,45 @@
 import asyncio
-from datetime import datetime
 
 import config
-from AnonXMusic import app
-from AnonXMusic.core.call import Anony, autoend
-from AnonXMusic.utils.database import get_client, is_active_chat, is_autoend
+from AnonXMusic.core.call import STAY_IN, Anony
+from AnonXMusic.utils.database import get_client, is_active_chat
+from AnonXMusic.utils.scheduler import scheduler
 from pyrogram.enums import ChatType
 
-async def auto_leave():
-    if config.AUTO_LEAVING_ASSISTANT:
-        while not await asyncio.sleep(config.ASSISTANT_LEAVE_TIME):
-            from AnonXMusic.core.userbot import assistants
-
-            for num in assistants:
-                client = await get_client(num)
-                left = 0
-                try:
-                    async for i in client.get_dialogs():
-                        if i.chat.type in [
-                            ChatType.SUPERGROUP,
-                            ChatType.GROUP,
-                            ChatType.CHANNEL,
-                        ]:
-                            if (
-                                i.chat.id != config.LOGGER_ID
-                                and i.chat.id != -1001580005596
-                                and i.chat.id != -1001866745564
-                            ):
-                                if left == 20:
-                                    continue
-                                if not await is_active_chat(i.chat.id):
-                                    try:
-                                        await client.leave_chat(i.chat.id)
-                                        left += 1
-                                    except:
-                                        continue
-                except:
-                    pass
-
-
-asyncio.create_task(auto_leave())
-
 
-async def auto_end():
-    while not await asyncio.sleep(5):
-        ender = await is_autoend()
-        if not ender:
-            continue
-        for chat_id in autoend:
-            timer = autoend.get(chat_id)
-            if not timer:
-                continue
-            if datetime.now() > timer:
-                if not await is_active_chat(chat_id):
-                    autoend[chat_id] = {}
+async def auto_leave():
+    """
+    Schedule a leave for every idle group the assistants sit in, once at boot.
+
+    After that, Anony schedules a leave whenever a stream ends and cancels it
+    when a new one starts, so no periodic dialog scan is needed.
+    """
+    if not config.AUTO_LEAVING_ASSISTANT:
+        return
+    from AnonXMusic.core.userbot import assistants
+
+    for num in assistants:
+        client = await get_client(num)
+        delay = config.ASSISTANT_LEAVE_TIME
+        try:
+            async for i in client.get_dialogs():
+                if i.chat.type not in [
+                    ChatType.SUPERGROUP,
+                    ChatType.GROUP,
+                    ChatType.CHANNEL,
+                ]:
                     continue
-                autoend[chat_id] = {}
-                try:
-                    await Anony.stop_stream(chat_id)
-                except:
+                if i.chat.id in STAY_IN or await is_active_chat(i.chat.id):
                     continue
-                try:
-                    await app.send_message(
-                        chat_id,
-                        "» ʙᴏᴛ ᴀᴜᴛᴏᴍᴀᴛɪᴄᴀʟʟʏ ʟᴇғᴛ ᴠɪᴅᴇᴏᴄʜᴀᴛ ʙᴇᴄᴀᴜsᴇ ɴᴏ ᴏɴᴇ ᴡᴀs ʟɪsᴛᴇɴɪɴɢ ᴏɴ ᴠɪᴅᴇᴏᴄʜᴀᴛ.",
-                    )
-                except:
+                if scheduler.pending(("autoleave", i.chat.id)):
                     continue
+                scheduler.schedule(
+                    ("autoleave", i.chat.id), delay, Anony.auto_leave, i.chat.id, client
+                )
+                # Spread the leaves out instead of leaving everything at once.
+                delay += 3
+        except:
+            pass
 
 
-asyncio.create_task(auto_end())
+asyncio.create_task(auto_leave())
@@ -1,10 +1,7 @@
 import asyncio
-import os
-import time
 from pyrogram import filters
 from pyrogram.types import Message
 from pyrogram.enums import ChatMembersFilter
-from pyrogram.errors import FloodWait
 
 from AnonXMusic import app
 from AnonXMusic.misc import SUDOERS
@@ -12,24 +9,126 @@ from AnonXMusic.utils.database import (
     get_active_chats,
     get_authuser_names,
     get_client,
-    get_served_chats,
-    get_served_users,
+    get_lang,
+    iter_served_chats,
+    iter_served_users,
 )
 from AnonXMusic.utils.decorators.language import language
-from AnonXMusic.utils.formatters import alpha_to_int
-from config import adminlist, CACHE_DURATION, CACHE_SLEEP ,file_cache, autoclean
+from AnonXMusic.utils.fanout import FanOut, unfinished_jobs
+from AnonXMusic.utils.formatters import alpha_to_int, get_readable_time
+from AnonXMusic.utils.stream.mediastore import mediastore
+from config import (
+    adminlist,
+    ASSISTANT_BROADCAST_RATE,
+    BROADCAST_RATE,
+    BROADCAST_WORKERS,
+    CACHE_DURATION,
+    CACHE_SLEEP,
+)
+from strings import get_string
 
 IS_BROADCASTING = False
 
 
+async def _send(job, chat_id):
+    params = job.params
+    m = (
+        await app.forward_messages(chat_id, params["from_chat"], params["message_id"])
+        if params["message_id"]
+        else await app.send_message(chat_id, text=params["text"])
+    )
+    if params["pin"]:
+        try:
+            await m.pin(disable_notification=not params["loud"])
+            job.stats["pins"] += 1
+        except:
+            pass
+    return True
+
+
+def _progress_text(job) -> str:
+    stats = job.snapshot()
+    return (
+        f"» ʙʀᴏᴀᴅᴄᴀsᴛɪɴɢ ᴛᴏ {job.params['kind']}...\n\n"
+        f"sᴇɴᴛ : {stats['done']}\n"
+        f"ғᴀɪʟᴇᴅ : {stats['failed']}\n"
+        f"ᴡᴀɪᴛɪɴɢ ᴏɴ ғʟᴏᴏᴅᴡᴀɪᴛ : {stats['deferred']}\n"
+        f"sᴘᴇᴇᴅ : {stats['speed']:.1f}/s\n"
+        f"ᴇʟᴀᴘsᴇᴅ : {get_readable_time(stats['elapsed']) or '0s'}"
+    )
+
+
+async def run_broadcast(job_id: str, params: dict, state: dict = None):
+    try:
+        language = await get_lang(params["chat_id"])
+        _ = get_string(language)
+    except:
+        _ = get_string("en")
+    try:
+        status = await app.send_message(params["chat_id"], _["broad_1"])
+    except:
+        status = None
+
+    async def progress(job):
+        if status:
+            await status.edit_text(_progress_text(job))
+
+    targets = iter_served_chats if params["kind"] == "chats" else iter_served_users
+    job = FanOut(
+        params["kind"],
+        _send,
+        BROADCAST_RATE,
+        BROADCAST_WORKERS,
+        job_id=job_id,
+        params=params,
+        state=state,
+        progress=progress,
+    )
+    stats = await job.run(targets(after=job.cursor))
+    if params["kind"] == "chats":
+        text = _["broad_3"].format(stats["done"], stats["pins"])
+    else:
+        text = _["broad_4"].format(stats["done"])
+    try:
+        if status:
+            await status.edit_text(text)
+        else:
+            await app.send_message(params["chat_id"], text)
+    except:
+        pass
+
+
+async def _assistant_broadcast(num: int, params: dict):
+    client = await get_client(num)
+
+    async def send(job, chat_id):
+        if params["message_id"]:
+            await client.forward_messages(
+                chat_id, params["from_chat"], params["message_id"]
+            )
+        else:
+            await client.send_message(chat_id, text=params["text"])
+        return True
+
+    async def dialogs():
+        async for dialog in client.get_dialogs():
+            yield dialog.chat.id
+
+    job = FanOut("assistant", send, ASSISTANT_BROADCAST_RATE, 2)
+    stats = await job.run(dialogs())
+    return num, stats["done"]
+
+
 @app.on_message(filters.command("broadcast") & SUDOERS)
 @language
-async def braodcast_message(client, message:Message, _):
+async def braodcast_message(client, message: Message, _):
     global IS_BROADCASTING
+    query = None
     if message.reply_to_message:
         x = message.reply_to_message.id
         y = message.chat.id
     else:
+        x = y = None
         if len(message.command) < 2:
             return await message.reply_text(_["broad_2"])
         query = message.text.split(None, 1)[1]
@@ -47,105 +146,63 @@ async def braodcast_message(client, message:Message, _):
             return await message.reply_text(_["broad_8"])
 
     IS_BROADCASTING = True
-    await message.reply_text(_["broad_1"])
-
-    if "-nobot" not in message.text:
-        sent = 0
-        pin = 0
-        chats = []
-        schats = await get_served_chats()
-        for chat in schats:
-            chats.append(int(chat["chat_id"]))
-        for i in chats:
-            try:
-                m = (
-                    await app.forward_messages(i, y, x)
-                    if message.reply_to_message
-                    else await app.send_message(i, text=query)
-                )
-                if "-pin" in message.text:
-                    try:
-                        await m.pin(disable_notification=True)
-                        pin += 1
-                    except:
-                        continue
-                elif "-pinloud" in message.text:
-                    try:
-                        await m.pin(disable_notification=False)
-                        pin += 1
-                    except:
-                        continue
-                sent += 1
-                await asyncio.sleep(0.2)
-            except FloodWait as fw:
-                flood_time = int(fw.value)
-                if flood_time > 200:
-                    continue
-                await asyncio.sleep(flood_time)
-            except:
-                continue
-        try:
-            await message.reply_text(_["broad_3"].format(sent, pin))
-        except:
-            pass
+    params = {
+        "chat_id": message.chat.id,
+        "from_chat": y,
+        "message_id": x,
+        "text": query,
+        "pin": "-pin" in message.text,
+        "loud": "-pinloud" in message.text,
+    }
+    helpers = None
+    try:
+        if "-assistant" in message.text:
+            # Assistants go through their own accounts, so they run alongside
+            # the bot broadcast instead of after it.
+            from AnonXMusic.core.userbot import assistants
 
-    if "-user" in message.text:
-        susr = 0
-        served_users = []
-        susers = await get_served_users()
-        for user in susers:
-            served_users.append(int(user["user_id"]))
-        for i in served_users:
+            aw = await message.reply_text(_["broad_5"])
+            helpers = asyncio.gather(
+                *[_assistant_broadcast(num, params) for num in assistants],
+                return_exceptions=True,
+            )
+
+        if "-nobot" not in message.text:
+            await run_broadcast(
+                f"chats:{message.chat.id}:{message.id}", dict(params, kind="chats")
+            )
+        if "-user" in message.text:
+            await run_broadcast(
+                f"users:{message.chat.id}:{message.id}", dict(params, kind="users")
+            )
+    finally:
+        # The assistants are still sending if the bot broadcast failed, so
+        # wait for them before reporting and clearing the flag.
+        if helpers:
+            text = _["broad_6"]
+            for result in await helpers:
+                if isinstance(result, tuple):
+                    text += _["broad_7"].format(*result)
             try:
-                m = (
-                    await app.forward_messages(i, y, x)
-                    if message.reply_to_message
-                    else await app.send_message(i, text=query)
-                )
-                susr += 1
-                await asyncio.sleep(0.2)
-            except FloodWait as fw:
-                flood_time = int(fw.value)
-                if flood_time > 200:
-                    continue
-                await asyncio.sleep(flood_time)
+                await aw.edit_text(text)
             except:
                 pass
-        try:
-            await message.reply_text(_["broad_4"].format(susr))
-        except:
-            pass
+        IS_BROADCASTING = False
 
-    if "-assistant" in message.text:
-        aw = await message.reply_text(_["broad_5"])
-        text = _["broad_6"]
-        from AnonXMusic.core.userbot import assistants
-
-        for num in assistants:
-            sent = 0
-            client = await get_client(num)
-            async for dialog in client.get_dialogs():
-                try:
-                    await client.forward_messages(
-                        dialog.chat.id, y, x
-                    ) if message.reply_to_message else await client.send_message(
-                        dialog.chat.id, text=query
-                    )
-                    sent += 1
-                    await asyncio.sleep(3)
-                except FloodWait as fw:
-                    flood_time = int(fw.value)
-                    if flood_time > 200:
-                        continue
-                    await asyncio.sleep(flood_time)
-                except:
-                    continue
-            text += _["broad_7"].format(num, sent)
-        try:
-            await aw.edit_text(text)
-        except:
-            pass
-    IS_BROADCASTING = False
+
+async def resume_broadcasts():
+    """Continue bot broadcasts that were interrupted by a restart."""
+    global IS_BROADCASTING
+    await asyncio.sleep(10)
+    for kind in ("chats", "users"):
+        for job in await unfinished_jobs(kind):
+            IS_BROADCASTING = True
+            try:
+                await run_broadcast(job["_id"], job["params"], job)
+            except:
+                continue
+            finally:
+                IS_BROADCASTING = False
 
 
 async def auto_clean():
@@ -169,27 +226,15 @@ async def auto_clean():
 
 
 async def auto_clean_cache():
-    """Periodically clean up expired files"""
+    """Periodically remove downloads that were not played for CACHE_DURATION"""
     while not await asyncio.sleep(CACHE_SLEEP):
         try:
-            current_time = time.time()
-            expired_files = [
-                file_path
-                for file_path, last_access in file_cache.items()
-                if current_time - last_access > CACHE_DURATION
-                and file_path not in autoclean
-            ]
-            
-            for file_path in expired_files:
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        file_cache.pop(file_path, None)
-                except:
-                    continue
+            mediastore.enforce(max_age=CACHE_DURATION)
         except:
             continue
 
 asyncio.create_task(auto_clean_cache())
 
+asyncio.create_task(resume_broadcasts())
+
 asyncio.create_task(auto_clean())
@@ -0,0 +1,52 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from AnonXMusic import app
+from AnonXMusic.misc import SUDOERS
+from AnonXMusic.utils.cookies import cookies
+from AnonXMusic.utils.formatters import convert_bytes
+from AnonXMusic.utils.stream.mediastore import mediastore
+from AnonXMusic.utils.ytdlp import ytdlp
+
+
+def _media_store() -> str:
+    stats = mediastore.stats()
+    lookups = stats["hits"] + stats["misses"]
+    ratio = f"{stats['hits'] * 100 / lookups:.1f}%" if lookups else "-"
+    return (
+        "<u><b>ᴍᴇᴅɪᴀ sᴛᴏʀᴇ :</b></u>\n"
+        f"ғɪʟᴇs : {stats['files']} ({stats['referenced']} ǫᴜᴇᴜᴇᴅ)\n"
+        f"sɪᴢᴇ : {convert_bytes(stats['size']) or '0 B'} / {convert_bytes(stats['budget'])}\n"
+        f"ʜɪᴛs : {stats['hits']} | ᴍɪssᴇs : {stats['misses']} | ʜɪᴛ ʀᴀᴛɪᴏ : {ratio}\n"
+        f"ᴇᴠɪᴄᴛɪᴏɴs : {stats['evictions']}\n"
+    )
+
+
+def _ytdlp_pool() -> str:
+    stats = ytdlp.stats()
+    return (
+        "<u><b>ʏᴛ-ᴅʟᴘ ᴘᴏᴏʟ :</b></u>\n"
+        f"ᴡᴏʀᴋᴇʀs : {stats['running']}/{stats['workers']} ʙᴜsʏ | ǫᴜᴇᴜᴇᴅ : {stats['queued']}\n"
+        f"ᴄᴏᴍᴘʟᴇᴛᴇᴅ : {stats['completed']} | ғᴀɪʟᴇᴅ : {stats['failed']}\n"
+        f"ᴛɪᴍᴇᴅ ᴏᴜᴛ : {stats['timed_out']} | ᴄᴀɴᴄᴇʟʟᴇᴅ : {stats['cancelled']}\n"
+        f"ᴀᴠɢ ᴊᴏʙ ᴛɪᴍᴇ : {stats['avg_time']}s\n"
+    )
+
+
+def _cookies() -> str:
+    text = "<u><b>ᴄᴏᴏᴋɪᴇs :</b></u>\n"
+    stats = cookies.stats()
+    if not stats:
+        return text + "ɴᴏ ᴄᴏᴏᴋɪᴇ ғɪʟᴇs ʟᴏᴀᴅᴇᴅ.\n"
+    for cookie in stats:
+        mark = "✅" if cookie["healthy"] else "💤"
+        text += (
+            f"{mark} <code>{cookie['file']}</code> : {cookie['successes']} ᴏᴋ | "
+            f"{cookie['failures']} ғᴀɪʟᴇᴅ | {cookie['latency']}s\n"
+        )
+    return text
+
+
+@app.on_message(filters.command(["cachestats", "poolstats"]) & SUDOERS)
+async def cache_stats(_, message: Message):
+    await message.reply_text("\n".join([_media_store(), _ytdlp_pool(), _cookies()]))
@@ -0,0 +1,26 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from AnonXMusic import app
+from AnonXMusic.misc import SUDOERS
+from AnonXMusic.utils.indexes import ensure_indexes, explain_queries
+
+
+@app.on_message(filters.command(["dbcheck", "explain"]) & SUDOERS)
+async def db_check(_, message: Message):
+    mystic = await message.reply_text("» ᴄʜᴇᴄᴋɪɴɢ ᴅᴀᴛᴀʙᴀsᴇ ǫᴜᴇʀʏ ᴘʟᴀɴs...")
+    if len(message.command) == 2 and message.command[1].lower() == "fix":
+        await ensure_indexes()
+    results = await explain_queries()
+    text = ""
+    scans = 0
+    for name, query, stages, collscan in results:
+        if collscan:
+            scans += 1
+        mark = "⚠️" if collscan else "✅"
+        text += f"{mark} <code>{name}</code> {query}\n    {' → '.join(stages)}\n"
+    if scans:
+        text += f"\n<b>{scans} ǫᴜᴇʀɪᴇs ᴀʀᴇ sᴄᴀɴɴɪɴɢ ᴛʜᴇɪʀ ᴡʜᴏʟᴇ ᴄᴏʟʟᴇᴄᴛɪᴏɴ.</b> ʀᴜɴ <code>/dbcheck fix</code> ᴛᴏ ᴄʀᴇᴀᴛᴇ ᴛʜᴇ ɪɴᴅᴇxᴇs."
+    else:
+        text += "\n<b>ᴀʟʟ ǫᴜᴇʀɪᴇs ᴀʀᴇ ɪɴᴅᴇxᴇᴅ.</b>"
+    await mystic.edit_text(text)
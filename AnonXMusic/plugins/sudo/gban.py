@@ -1,7 +1,6 @@
 import asyncio
 
 from pyrogram import filters
-from pyrogram.errors import FloodWait
 from pyrogram.types import Message
 
 from AnonXMusic import app
@@ -10,14 +9,93 @@ from AnonXMusic.utils import get_readable_time
 from AnonXMusic.utils.database import (
     add_banned_user,
     get_banned_count,
-    get_banned_users,
-    get_served_chats,
+    get_lang,
+    get_served_chats_count,
     is_banned_user,
+    iter_banned_users,
+    iter_served_chats,
     remove_banned_user,
 )
 from AnonXMusic.utils.decorators.language import language
 from AnonXMusic.utils.extraction import extract_user
-from config import BANNED_USERS
+from AnonXMusic.utils.fanout import FanOut, unfinished_jobs
+from config import BANNED_USERS, GBAN_RATE, GBAN_WORKERS
+from strings import get_string
+
+
+async def _ban(job, chat_id):
+    await app.ban_chat_member(chat_id, job.params["user_id"])
+    return True
+
+
+async def _unban(job, chat_id):
+    await app.unban_chat_member(chat_id, job.params["user_id"])
+    return True
+
+
+async def run_gban(job_id: str, params: dict, state: dict = None, mystic=None):
+    """Ban or unban params["user_id"] in every served chat and post the report."""
+    try:
+        language = await get_lang(params["chat_id"])
+        _ = get_string(language)
+    except:
+        _ = get_string("en")
+    gban = params["mode"] == "gban"
+
+    async def progress(job):
+        if mystic:
+            stats = job.snapshot()
+            await mystic.edit_text(
+                f"» {'ɢʙᴀɴɴɪɴɢ' if gban else 'ᴜɴɢʙᴀɴɴɪɴɢ'} {params['mention']}...\n\n"
+                f"ᴅᴏɴᴇ : {stats['done']}\n"
+                f"ғᴀɪʟᴇᴅ : {stats['failed']}\n"
+                f"ᴡᴀɪᴛɪɴɢ ᴏɴ ғʟᴏᴏᴅᴡᴀɪᴛ : {stats['deferred']}\n"
+                f"sᴘᴇᴇᴅ : {stats['speed']:.1f}/s"
+            )
+
+    job = FanOut(
+        params["mode"],
+        _ban if gban else _unban,
+        GBAN_RATE,
+        GBAN_WORKERS,
+        job_id=job_id,
+        params=params,
+        state=state,
+        progress=progress,
+    )
+    stats = await job.run(iter_served_chats(after=job.cursor))
+    if gban:
+        await add_banned_user(params["user_id"])
+        text = _["gban_6"].format(
+            app.mention,
+            params["origin_title"],
+            params["origin_id"],
+            params["mention"],
+            params["user_id"],
+            params["by"],
+            stats["done"],
+        )
+    else:
+        await remove_banned_user(params["user_id"])
+        text = _["gban_9"].format(params["mention"], stats["done"])
+    text += (
+        f"\n\n<b>ғᴀɪʟᴇᴅ :</b> {stats['failed']}"
+        f"\n<b>ғʟᴏᴏᴅᴡᴀɪᴛs :</b> {stats['floodwaits']}"
+        f"\n<b>ᴛᴏᴏᴋ :</b> {get_readable_time(job.snapshot()['elapsed']) or '0s'}"
+    )
+    try:
+        await app.send_message(params["chat_id"], text)
+    except:
+        pass
+    if mystic:
+        try:
+            await mystic.delete()
+        except:
+            pass
+
+
+def _expected_time(chats: int) -> str:
+    return get_readable_time(int(chats / GBAN_RATE)) or "0s"
 
 
 @app.on_message(filters.command(["gban", "globalban"]) & SUDOERS)
@@ -38,34 +116,18 @@ async def global_ban(client, message: Message, _):
         return await message.reply_text(_["gban_4"].format(user.mention))
     if user.id not in BANNED_USERS:
         BANNED_USERS.add(user.id)
-    served_chats = []
-    chats = await get_served_chats()
-    for chat in chats:
-        served_chats.append(int(chat["chat_id"]))
-    time_expected = get_readable_time(len(served_chats))
+    time_expected = _expected_time(await get_served_chats_count())
     mystic = await message.reply_text(_["gban_5"].format(user.mention, time_expected))
-    number_of_chats = 0
-    for chat_id in served_chats:
-        try:
-            await app.ban_chat_member(chat_id, user.id)
-            number_of_chats += 1
-        except FloodWait as fw:
-            await asyncio.sleep(int(fw.value))
-        except:
-            continue
-    await add_banned_user(user.id)
-    await message.reply_text(
-        _["gban_6"].format(
-            app.mention,
-            message.chat.title,
-            message.chat.id,
-            user.mention,
-            user.id,
-            message.from_user.mention,
-            number_of_chats,
-        )
-    )
-    await mystic.delete()
+    params = {
+        "mode": "gban",
+        "user_id": user.id,
+        "mention": user.mention,
+        "chat_id": message.chat.id,
+        "origin_title": message.chat.title,
+        "origin_id": message.chat.id,
+        "by": message.from_user.mention,
+    }
+    await run_gban(f"gban:{user.id}", params, mystic=mystic)
 
 
 @app.on_message(filters.command(["ungban"]) & SUDOERS)
@@ -80,24 +142,15 @@ async def global_un(client, message: Message, _):
         return await message.reply_text(_["gban_7"].format(user.mention))
     if user.id in BANNED_USERS:
         BANNED_USERS.remove(user.id)
-    served_chats = []
-    chats = await get_served_chats()
-    for chat in chats:
-        served_chats.append(int(chat["chat_id"]))
-    time_expected = get_readable_time(len(served_chats))
+    time_expected = _expected_time(await get_served_chats_count())
     mystic = await message.reply_text(_["gban_8"].format(user.mention, time_expected))
-    number_of_chats = 0
-    for chat_id in served_chats:
-        try:
-            await app.unban_chat_member(chat_id, user.id)
-            number_of_chats += 1
-        except FloodWait as fw:
-            await asyncio.sleep(int(fw.value))
-        except:
-            continue
-    await remove_banned_user(user.id)
-    await message.reply_text(_["gban_9"].format(user.mention, number_of_chats))
-    await mystic.delete()
+    params = {
+        "mode": "ungban",
+        "user_id": user.id,
+        "mention": user.mention,
+        "chat_id": message.chat.id,
+    }
+    await run_gban(f"ungban:{user.id}", params, mystic=mystic)
 
 
 @app.on_message(filters.command(["gbannedusers", "gbanlist"]) & SUDOERS)
@@ -109,17 +162,58 @@ async def gbanned_list(client, message: Message, _):
     mystic = await message.reply_text(_["gban_11"])
     msg = _["gban_12"]
     count = 0
-    users = await get_banned_users()
-    for user_id in users:
-        count += 1
-        try:
-            user = await app.get_users(user_id)
-            user = user.first_name if not user.mention else user.mention
-            msg += f"{count}➤ {user}\n"
-        except Exception:
-            msg += f"{count}➤ {user_id}\n"
-            continue
+    batch = []
+    async for user_id in iter_banned_users():
+        batch.append(user_id)
+        if len(batch) == 200:
+            msg, count = await _list_users(batch, msg, count)
+            batch = []
+    if batch:
+        msg, count = await _list_users(batch, msg, count)
     if count == 0:
         return await mystic.edit_text(_["gban_10"])
     else:
         return await mystic.edit_text(msg)
+
+
+async def _get_users(user_ids: list) -> dict:
+    try:
+        return {user.id: user for user in await app.get_users(user_ids)}
+    except Exception:
+        if len(user_ids) == 1:
+            return {}
+    # One unresolvable peer fails the whole batch, split it so only that id is lost.
+    half = len(user_ids) // 2
+    return {**await _get_users(user_ids[:half]), **await _get_users(user_ids[half:])}
+
+
+async def _list_users(user_ids: list, msg: str, count: int):
+    users = await _get_users(user_ids)
+    for user_id in user_ids:
+        count += 1
+        user = users.get(user_id)
+        if user:
+            user = user.first_name if not user.mention else user.mention
+            msg += f"{count}➤ {user}\n"
+        else:
+            msg += f"{count}➤ {user_id}\n"
+    return msg, count
+
+
+async def resume_gbans():
+    """Finish global bans/unbans that were interrupted by a restart."""
+    await asyncio.sleep(10)
+    for mode in ("gban", "ungban"):
+        for job in await unfinished_jobs(mode):
+            params = job["params"]
+            if mode == "gban":
+                BANNED_USERS.add(params["user_id"])
+            else:
+                BANNED_USERS.discard(params["user_id"])
+            try:
+                await run_gban(job["_id"], params, job)
+            except:
+                continue
+
+
+asyncio.create_task(resume_gbans())
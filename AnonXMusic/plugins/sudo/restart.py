@@ -19,6 +19,7 @@ from AnonXMusic.utils.database import (
 )
 from AnonXMusic.utils.decorators.language import language
 from AnonXMusic.utils.pastebin import AnonyBin
+from AnonXMusic.utils.writebehind import writes
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -92,6 +93,7 @@ async def update_(client, message, _):
     except:
         pass
 
+    await writes.close()
     if await is_heroku():
         try:
             os.system(
@@ -130,6 +132,7 @@ async def restart_(_, message):
         shutil.rmtree("cache")
     except:
         pass
+    await writes.close()
     await response.edit_text(
         "» ʀᴇsᴛᴀʀᴛ ᴘʀᴏᴄᴇss sᴛᴀʀᴛᴇᴅ, ᴘʟᴇᴀsᴇ ᴡᴀɪᴛ ғᴏʀ ғᴇᴡ sᴇᴄᴏɴᴅs ᴜɴᴛɪʟ ᴛʜᴇ ʙᴏᴛ sᴛᴀʀᴛs..."
     )
@@ -9,6 +9,7 @@ from pyrogram.types import Message, InlineKeyboardButton, InlineKeyboardMarkup,
 from pyrogram.enums import ParseMode
 from pyrogram.errors import FloodWait
 from AnonXMusic import app ## make sure you use your own repo module name 
+from AnonXMusic.core.http import get_session
 from AnonXMusic.utils.database import get_model_settings
 from config import BANNED_USERS
 import random
@@ -350,15 +351,14 @@ async def make_tts_request(text: str) -> tuple[bool, bytes | str, str]:
             "text": text,
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=body, timeout=aiohttp.ClientTimeout(total=60)) as response:
-                response.raise_for_status()
-                
-                audio_bytes = await response.read()
-                if audio_bytes:
-                    return True, audio_bytes, model
-                else:
-                    return False, "❌ TTS generation failed. Empty audio response.", ""
+        async with get_session().post(url, headers=headers, json=body, timeout=aiohttp.ClientTimeout(total=60)) as response:
+            response.raise_for_status()
+            
+            audio_bytes = await response.read()
+            if audio_bytes:
+                return True, audio_bytes, model
+            else:
+                return False, "❌ TTS generation failed. Empty audio response.", ""
 
     except asyncio.TimeoutError:
         return False, "⏰ TTS request timed out. Please try again.", ""
@@ -444,15 +444,14 @@ async def make_image_request(text: str) -> tuple[bool, bytes | str]:
             "prompt": text,
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=body, timeout=aiohttp.ClientTimeout(total=120)) as response:
-                response.raise_for_status()
-                
-                image_bytes = await response.read()
-                if image_bytes:
-                    return True, image_bytes
-                else:
-                    return False, "❌ Image generation failed. Empty image response."
+        async with get_session().post(url, headers=headers, json=body, timeout=aiohttp.ClientTimeout(total=120)) as response:
+            response.raise_for_status()
+            
+            image_bytes = await response.read()
+            if image_bytes:
+                return True, image_bytes
+            else:
+                return False, "❌ Image generation failed. Empty image response."
 
     except asyncio.TimeoutError:
         return False, "⏰ Image generation timed out. Please try again."
@@ -1,5 +1,4 @@
 import asyncio
-import os
 
 from pyrogram import filters
 from pyrogram.errors import FloodWait
@@ -12,16 +11,16 @@ from AnonXMusic.utils import AnonyBin, get_channeplayCB, seconds_to_min
 from AnonXMusic.utils.database import get_cmode, is_active_chat, is_music_playing
 from AnonXMusic.utils.decorators.language import language, languageCB
 from AnonXMusic.utils.inline import queue_back_markup, queue_markup
+from AnonXMusic.utils.stream import clock
+from AnonXMusic.utils.thumbnails import thumb_path, thumbcache
 from config import BANNED_USERS
 
 basic = {}
 
 
 def get_image(videoid):
-    if os.path.isfile(f"cache/{videoid}.png"):
-        return f"cache/{videoid}.png"
-    else:
-        return config.YOUTUBE_IMG_URL
+    # Evicted thumbnails are still sent by their file_id through send_photo.
+    return thumbcache.find(thumb_path(videoid)) or config.YOUTUBE_IMG_URL
 
 
 def get_duration(playing):
@@ -92,7 +91,7 @@ async def get_queue(client, message: Message, _):
             DUR,
             "c" if cplay else "g",
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(clock.played(got[0])),
             got[0]["dur"],
         )
     )
@@ -111,7 +110,7 @@ async def get_queue(client, message: Message, _):
                                     DUR,
                                     "c" if cplay else "g",
                                     videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
+                                    seconds_to_min(clock.played(db[chat_id][0])),
                                     db[chat_id][0]["dur"],
                                 )
                                 await mystic.edit_reply_markup(reply_markup=buttons)
@@ -232,13 +231,13 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
             DUR,
             cplay,
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(clock.played(got[0])),
             got[0]["dur"],
         )
     )
     basic[videoid] = True
 
-    med = InputMediaPhoto(media=IMAGE, caption=cap)
+    med = InputMediaPhoto(media=thumbcache.media(IMAGE), caption=cap)
     mystic = await CallbackQuery.edit_message_media(media=med, reply_markup=upl)
     if DUR != "Unknown":
         try:
@@ -253,7 +252,7 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
                                     DUR,
                                     cplay,
                                     videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
+                                    seconds_to_min(clock.played(db[chat_id][0])),
                                     db[chat_id][0]["dur"],
                                 )
                                 await mystic.edit_reply_markup(reply_markup=buttons)
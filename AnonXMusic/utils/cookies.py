@@ -0,0 +1,125 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+
+import config
+
+RESCAN_INTERVAL = 10
+MAX_COOLDOWN = 3600
+
+
+class Cookie:
+    def __init__(self, path: str, mtime: float):
+        self.path = path
+        self.mtime = mtime
+        self.successes = 0
+        self.failures = 0
+        self.streak = 0
+        self.strikes = 0
+        self.latency = 0.0
+        self.inflight = 0
+        self.resting_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.resting_until <= time.time()
+
+
+class CookiePool:
+    """
+    Cookie files from the cookies/ directory with per-file health tracking.
+
+    Files are loaded once and the directory is re-checked at most every
+    RESCAN_INTERVAL seconds. Picks go to the healthy cookie with the fewest
+    jobs in flight; cookies that keep failing are rested for a while.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.cookies = {}
+        self.checked = 0.0
+
+    def scan(self):
+        self.checked = time.time()
+        found = {}
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if not name.endswith(".txt"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                cookie = self.cookies.get(path)
+                # a replaced file starts with a clean record
+                if not cookie or cookie.mtime != mtime:
+                    cookie = Cookie(path, mtime)
+                found[path] = cookie
+        self.cookies = found
+
+    def pick(self):
+        if time.time() - self.checked > RESCAN_INTERVAL:
+            self.scan()
+        if not self.cookies:
+            return None
+        healthy = [c for c in self.cookies.values() if c.healthy]
+        if not healthy:
+            return min(self.cookies.values(), key=lambda c: c.resting_until).path
+        least = min(c.inflight for c in healthy)
+        return random.choice([c for c in healthy if c.inflight == least]).path
+
+    def report(self, path: str, ok: bool, latency: float):
+        cookie = self.cookies.get(path)
+        if not cookie:
+            return
+        cookie.latency = latency if not cookie.latency else cookie.latency * 0.8 + latency * 0.2
+        if ok:
+            cookie.successes += 1
+            cookie.streak = 0
+            cookie.strikes = 0
+            return
+        cookie.failures += 1
+        cookie.streak += 1
+        if cookie.streak >= config.COOKIE_FAILURE_LIMIT:
+            cookie.streak = 0
+            cookie.strikes += 1
+            cooldown = min(MAX_COOLDOWN, config.COOKIE_COOLDOWN * 2 ** (cookie.strikes - 1))
+            cookie.resting_until = time.time() + cooldown
+
+    @contextmanager
+    def track(self, path: str):
+        """
+        Record the outcome of one use of a cookie. An exception counts as a
+        failure, as does setting "ok" to False on the yielded result.
+        """
+        result = {"ok": True}
+        cookie = self.cookies.get(path)
+        if cookie:
+            cookie.inflight += 1
+        start = time.monotonic()
+        try:
+            yield result
+        except Exception:
+            result["ok"] = False
+            raise
+        finally:
+            if cookie:
+                cookie.inflight -= 1
+            self.report(path, result["ok"], time.monotonic() - start)
+
+    def stats(self) -> list:
+        return [
+            {
+                "file": os.path.basename(c.path),
+                "healthy": c.healthy,
+                "successes": c.successes,
+                "failures": c.failures,
+                "latency": round(c.latency, 2),
+            }
+            for c in self.cookies.values()
+        ]
+
+
+cookies = CookiePool(f"{os.getcwd()}/cookies")
@@ -1,8 +1,13 @@
+import asyncio
 import random
+import time
 from typing import Dict, List, Union
 
 from AnonXMusic import userbot
 from AnonXMusic.core.mongo import mongodb
+from AnonXMusic.misc import db
+from AnonXMusic.utils.stream import clock
+from AnonXMusic.utils.writebehind import writes
 
 authdb = mongodb.adminauth
 authuserdb = mongodb.authuser
@@ -24,20 +29,43 @@ usersdb = mongodb.tgusersdb
 modeldb = mongodb.model
 
 # Shifting to memory [mongo sucks often]
-active = []
-activevideo = []
+# chat_id -> {"assistant", "started", "streamtype"}, in the order chats went live
+active = {}
+activevideo = {}
 assistantdict = {}
+authusers = {}
 autoend = {}
+autoendmode = {}
 count = {}
 channelconnect = {}
 langm = {}
 loop = {}
 maintenance = []
 nonadmin = {}
+onoff = {}
 pause = {}
 playmode = {}
 playtype = {}
 skipmode = {}
+# Collections fully loaded by preload_settings, a miss there means no document.
+preloaded = set()
+
+
+# Settings caches above are filled by key presence, not truthiness: a cached
+# False/None/default is authoritative and the setters keep it current.
+async def _exists(collection, query: dict) -> bool:
+    if collection.name in preloaded:
+        return False
+    return bool(await collection.find_one(query, {"_id": 1}))
+
+
+async def _field(collection, query: dict, field: str, default=None):
+    if collection.name in preloaded:
+        return default
+    doc = await collection.find_one(query, {field: 1})
+    if not doc:
+        return default
+    return doc.get(field, default)
 
 
 async def get_assistant_number(chat_id: int) -> str:
@@ -60,11 +88,8 @@ async def get_client(assistant: int):
 
 async def set_assistant_new(chat_id, number):
     number = int(number)
-    await assdb.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"assistant": number}},
-        upsert=True,
-    )
+    assistantdict[chat_id] = number
+    writes.set(assdb, {"chat_id": chat_id}, {"assistant": number})
 
 
 async def set_assistant(chat_id):
@@ -72,11 +97,7 @@ async def set_assistant(chat_id):
 
     ran_assistant = random.choice(assistants)
     assistantdict[chat_id] = ran_assistant
-    await assdb.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"assistant": ran_assistant}},
-        upsert=True,
-    )
+    writes.set(assdb, {"chat_id": chat_id}, {"assistant": ran_assistant})
     userbot = await get_client(ran_assistant)
     return userbot
 
@@ -113,11 +134,7 @@ async def set_calls_assistant(chat_id):
 
     ran_assistant = random.choice(assistants)
     assistantdict[chat_id] = ran_assistant
-    await assdb.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"assistant": ran_assistant}},
-        upsert=True,
-    )
+    writes.set(assdb, {"chat_id": chat_id}, {"assistant": ran_assistant})
     return ran_assistant
 
 
@@ -154,15 +171,9 @@ async def group_assistant(self, chat_id: int) -> int:
 
 
 async def is_skipmode(chat_id: int) -> bool:
-    mode = skipmode.get(chat_id)
-    if not mode:
-        user = await skipdb.find_one({"chat_id": chat_id})
-        if not user:
-            skipmode[chat_id] = True
-            return True
-        skipmode[chat_id] = False
-        return False
-    return mode
+    if chat_id not in skipmode:
+        skipmode[chat_id] = not await _exists(skipdb, {"chat_id": chat_id})
+    return skipmode[chat_id]
 
 
 async def skip_on(chat_id: int):
@@ -180,38 +191,34 @@ async def skip_off(chat_id: int):
 
 
 async def get_upvote_count(chat_id: int) -> int:
-    mode = count.get(chat_id)
-    if not mode:
-        mode = await countdb.find_one({"chat_id": chat_id})
-        if not mode:
-            return 5
-        count[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    if chat_id not in count:
+        count[chat_id] = await _field(countdb, {"chat_id": chat_id}, "mode", 5)
+    return count[chat_id]
 
 
 async def set_upvotes(chat_id: int, mode: int):
     count[chat_id] = mode
-    await countdb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    writes.set(countdb, {"chat_id": chat_id}, {"mode": mode})
 
 
 async def is_autoend() -> bool:
     chat_id = 1234
-    user = await autoenddb.find_one({"chat_id": chat_id})
-    if not user:
-        return False
-    return True
+    if chat_id not in autoendmode:
+        autoendmode[chat_id] = await _exists(autoenddb, {"chat_id": chat_id})
+    return autoendmode[chat_id]
 
 
 async def autoend_on():
     chat_id = 1234
-    await autoenddb.insert_one({"chat_id": chat_id})
+    autoendmode[chat_id] = True
+    user = await autoenddb.find_one({"chat_id": chat_id})
+    if not user:
+        await autoenddb.insert_one({"chat_id": chat_id})
 
 
 async def autoend_off():
     chat_id = 1234
+    autoendmode[chat_id] = False
     await autoenddb.delete_one({"chat_id": chat_id})
 
 
@@ -227,76 +234,51 @@ async def set_loop(chat_id: int, mode: int):
 
 
 async def get_cmode(chat_id: int) -> int:
-    mode = channelconnect.get(chat_id)
-    if not mode:
-        mode = await channeldb.find_one({"chat_id": chat_id})
-        if not mode:
-            return None
-        channelconnect[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    if chat_id not in channelconnect:
+        channelconnect[chat_id] = await _field(channeldb, {"chat_id": chat_id}, "mode")
+    return channelconnect[chat_id]
 
 
 async def set_cmode(chat_id: int, mode: int):
     channelconnect[chat_id] = mode
-    await channeldb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    writes.set(channeldb, {"chat_id": chat_id}, {"mode": mode})
 
 
 async def get_playtype(chat_id: int) -> str:
-    mode = playtype.get(chat_id)
-    if not mode:
-        mode = await playtypedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playtype[chat_id] = "Everyone"
-            return "Everyone"
-        playtype[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    if chat_id not in playtype:
+        playtype[chat_id] = await _field(
+            playtypedb, {"chat_id": chat_id}, "mode", "Everyone"
+        )
+    return playtype[chat_id]
 
 
 async def set_playtype(chat_id: int, mode: str):
     playtype[chat_id] = mode
-    await playtypedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    writes.set(playtypedb, {"chat_id": chat_id}, {"mode": mode})
 
 
 async def get_playmode(chat_id: int) -> str:
-    mode = playmode.get(chat_id)
-    if not mode:
-        mode = await playmodedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playmode[chat_id] = "Direct"
-            return "Direct"
-        playmode[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    if chat_id not in playmode:
+        playmode[chat_id] = await _field(
+            playmodedb, {"chat_id": chat_id}, "mode", "Direct"
+        )
+    return playmode[chat_id]
 
 
 async def set_playmode(chat_id: int, mode: str):
     playmode[chat_id] = mode
-    await playmodedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    writes.set(playmodedb, {"chat_id": chat_id}, {"mode": mode})
 
 
 async def get_lang(chat_id: int) -> str:
-    mode = langm.get(chat_id)
-    if not mode:
-        lang = await langdb.find_one({"chat_id": chat_id})
-        if not lang:
-            langm[chat_id] = "en"
-            return "en"
-        langm[chat_id] = lang["lang"]
-        return lang["lang"]
-    return mode
+    if chat_id not in langm:
+        langm[chat_id] = await _field(langdb, {"chat_id": chat_id}, "lang", "en")
+    return langm[chat_id]
 
 
 async def set_lang(chat_id: int, lang: str):
     langm[chat_id] = lang
-    await langdb.update_one({"chat_id": chat_id}, {"$set": {"lang": lang}}, upsert=True)
+    writes.set(langdb, {"chat_id": chat_id}, {"lang": lang})
 
 
 async def is_music_playing(chat_id: int) -> bool:
@@ -308,52 +290,62 @@ async def is_music_playing(chat_id: int) -> bool:
 
 async def music_on(chat_id: int):
     pause[chat_id] = True
+    playing = db.get(chat_id)
+    if playing:
+        clock.resume(playing[0])
 
 
 async def music_off(chat_id: int):
     pause[chat_id] = False
+    playing = db.get(chat_id)
+    if playing:
+        clock.pause(playing[0])
 
 
 async def get_active_chats() -> list:
-    return active
+    return list(active)
+
+
+async def get_active_chat(chat_id: int) -> Union[dict, None]:
+    return active.get(chat_id)
 
 
 async def is_active_chat(chat_id: int) -> bool:
-    if chat_id not in active:
-        return False
-    else:
-        return True
+    return chat_id in active
 
 
-async def add_active_chat(chat_id: int):
+async def add_active_chat(chat_id: int, streamtype: str = "audio"):
     if chat_id not in active:
-        active.append(chat_id)
+        active[chat_id] = {
+            "assistant": assistantdict.get(chat_id),
+            "started": time.time(),
+            "streamtype": "video" if chat_id in activevideo else streamtype,
+        }
 
 
 async def remove_active_chat(chat_id: int):
-    if chat_id in active:
-        active.remove(chat_id)
+    active.pop(chat_id, None)
 
 
 async def get_active_video_chats() -> list:
-    return activevideo
+    return list(activevideo)
 
 
 async def is_active_video_chat(chat_id: int) -> bool:
-    if chat_id not in activevideo:
-        return False
-    else:
-        return True
+    return chat_id in activevideo
 
 
 async def add_active_video_chat(chat_id: int):
     if chat_id not in activevideo:
-        activevideo.append(chat_id)
+        activevideo[chat_id] = time.time()
+    if chat_id in active:
+        active[chat_id]["streamtype"] = "video"
 
 
 async def remove_active_video_chat(chat_id: int):
-    if chat_id in activevideo:
-        activevideo.remove(chat_id)
+    activevideo.pop(chat_id, None)
+    if chat_id in active:
+        active[chat_id]["streamtype"] = "audio"
 
 
 async def check_nonadmin_chat(chat_id: int) -> bool:
@@ -364,15 +356,9 @@ async def check_nonadmin_chat(chat_id: int) -> bool:
 
 
 async def is_nonadmin_chat(chat_id: int) -> bool:
-    mode = nonadmin.get(chat_id)
-    if not mode:
-        user = await authdb.find_one({"chat_id": chat_id})
-        if not user:
-            nonadmin[chat_id] = False
-            return False
-        nonadmin[chat_id] = True
-        return True
-    return mode
+    if chat_id not in nonadmin:
+        nonadmin[chat_id] = await _exists(authdb, {"chat_id": chat_id})
+    return nonadmin[chat_id]
 
 
 async def add_nonadmin_chat(chat_id: int):
@@ -392,16 +378,16 @@ async def remove_nonadmin_chat(chat_id: int):
 
 
 async def is_on_off(on_off: int) -> bool:
-    onoff = await onoffdb.find_one({"on_off": on_off})
-    if not onoff:
-        return False
-    return True
+    if on_off not in onoff:
+        onoff[on_off] = await _exists(onoffdb, {"on_off": on_off})
+    return onoff[on_off]
 
 
 async def add_on(on_off: int):
     is_on = await is_on_off(on_off)
     if is_on:
         return
+    onoff[on_off] = True
     return await onoffdb.insert_one({"on_off": on_off})
 
 
@@ -409,13 +395,13 @@ async def add_off(on_off: int):
     is_off = await is_on_off(on_off)
     if not is_off:
         return
+    onoff[on_off] = False
     return await onoffdb.delete_one({"on_off": on_off})
 
 
 async def is_maintenance():
     if not maintenance:
-        get = await onoffdb.find_one({"on_off": 1})
-        if not get:
+        if not await is_on_off(1):
             maintenance.clear()
             maintenance.append(2)
             return True
@@ -433,19 +419,13 @@ async def is_maintenance():
 async def maintenance_off():
     maintenance.clear()
     maintenance.append(2)
-    is_off = await is_on_off(1)
-    if not is_off:
-        return
-    return await onoffdb.delete_one({"on_off": 1})
+    return await add_off(1)
 
 
 async def maintenance_on():
     maintenance.clear()
     maintenance.append(1)
-    is_on = await is_on_off(1)
-    if is_on:
-        return
-    return await onoffdb.insert_one({"on_off": 1})
+    return await add_on(1)
 
 
 async def is_served_user(user_id: int) -> bool:
@@ -462,11 +442,21 @@ async def get_served_users() -> list:
     return users_list
 
 
+async def iter_served_users(after: int = None):
+    # Sorted by id so a resumed job can continue after the last one it finished.
+    cursor = usersdb.find(
+        {"user_id": {"$gt": max(after or 0, 0)}}, {"_id": 0, "user_id": 1}
+    ).sort("user_id", 1)
+    async for user in cursor:
+        yield user["user_id"]
+
+
+async def get_served_users_count() -> int:
+    return await usersdb.count_documents({"user_id": {"$gt": 0}})
+
+
 async def add_served_user(user_id: int):
-    is_served = await is_served_user(user_id)
-    if is_served:
-        return
-    return await usersdb.insert_one({"user_id": user_id})
+    writes.insert(usersdb, {"user_id": user_id})
 
 
 async def get_served_chats() -> list:
@@ -476,6 +466,19 @@ async def get_served_chats() -> list:
     return chats_list
 
 
+async def iter_served_chats(after: int = None):
+    query = {"chat_id": {"$lt": 0}}
+    if after is not None:
+        query["chat_id"]["$gt"] = after
+    cursor = chatsdb.find(query, {"_id": 0, "chat_id": 1}).sort("chat_id", 1)
+    async for chat in cursor:
+        yield chat["chat_id"]
+
+
+async def get_served_chats_count() -> int:
+    return await chatsdb.count_documents({"chat_id": {"$lt": 0}})
+
+
 async def is_served_chat(chat_id: int) -> bool:
     chat = await chatsdb.find_one({"chat_id": chat_id})
     if not chat:
@@ -484,17 +487,22 @@ async def is_served_chat(chat_id: int) -> bool:
 
 
 async def add_served_chat(chat_id: int):
-    is_served = await is_served_chat(chat_id)
-    if is_served:
-        return
-    return await chatsdb.insert_one({"chat_id": chat_id})
+    writes.insert(chatsdb, {"chat_id": chat_id})
 
 
 async def blacklisted_chats() -> list:
-    chats_list = []
-    async for chat in blacklist_chatdb.find({"chat_id": {"$lt": 0}}):
-        chats_list.append(chat["chat_id"])
-    return chats_list
+    return [chat_id async for chat_id in iter_blacklisted_chats()]
+
+
+async def iter_blacklisted_chats():
+    async for chat in blacklist_chatdb.find(
+        {"chat_id": {"$lt": 0}}, {"_id": 0, "chat_id": 1}
+    ):
+        yield chat["chat_id"]
+
+
+async def is_blacklisted_chat(chat_id: int) -> bool:
+    return await _exists(blacklist_chatdb, {"chat_id": chat_id})
 
 
 async def blacklist_chat(chat_id: int) -> bool:
@@ -512,10 +520,11 @@ async def whitelist_chat(chat_id: int) -> bool:
 
 
 async def _get_authusers(chat_id: int) -> Dict[str, int]:
-    _notes = await authuserdb.find_one({"chat_id": chat_id})
-    if not _notes:
-        return {}
-    return _notes["notes"]
+    if chat_id not in authusers:
+        authusers[chat_id] = (
+            await _field(authuserdb, {"chat_id": chat_id}, "notes") or {}
+        )
+    return authusers[chat_id]
 
 
 async def get_authuser_names(chat_id: int) -> List[str]:
@@ -559,11 +568,12 @@ async def delete_authuser(chat_id: int, name: str) -> bool:
 
 
 async def get_gbanned() -> list:
-    results = []
-    async for user in gbansdb.find({"user_id": {"$gt": 0}}):
-        user_id = user["user_id"]
-        results.append(user_id)
-    return results
+    return [user_id async for user_id in iter_gbanned()]
+
+
+async def iter_gbanned():
+    async for user in gbansdb.find({"user_id": {"$gt": 0}}, {"_id": 0, "user_id": 1}):
+        yield user["user_id"]
 
 
 async def is_gbanned_user(user_id: int) -> bool:
@@ -613,17 +623,16 @@ async def remove_sudo(user_id: int) -> bool:
 
 
 async def get_banned_users() -> list:
-    results = []
-    async for user in blockeddb.find({"user_id": {"$gt": 0}}):
-        user_id = user["user_id"]
-        results.append(user_id)
-    return results
+    return [user_id async for user_id in iter_banned_users()]
+
+
+async def iter_banned_users():
+    async for user in blockeddb.find({"user_id": {"$gt": 0}}, {"_id": 0, "user_id": 1}):
+        yield user["user_id"]
 
 
 async def get_banned_count() -> int:
-    users = blockeddb.find({"user_id": {"$gt": 0}})
-    users = await users.to_list(length=100000)
-    return len(users)
+    return await blockeddb.count_documents({"user_id": {"$gt": 0}})
 
 
 async def is_banned_user(user_id: int) -> bool:
@@ -665,3 +674,38 @@ async def update_model_settings(settings: dict) -> bool:
         upsert=True
     )
     return True
+
+
+async def _preload(collection, cache: dict, field: str = None, value=None) -> int:
+    loaded = 0
+    projection = {"_id": 0, "chat_id": 1}
+    if field:
+        projection[field] = 1
+    async for doc in collection.find({}, projection):
+        chat_id = doc.get("chat_id")
+        if chat_id is None:
+            continue
+        # Values set while the preload was running are newer, keep them.
+        cache.setdefault(chat_id, doc.get(field) if field else value)
+        loaded += 1
+    preloaded.add(collection.name)
+    return loaded
+
+
+async def preload_settings():
+    """Load every per-chat settings collection into memory, returns (records, seconds)."""
+    start = time.monotonic()
+    results = await asyncio.gather(
+        _preload(langdb, langm, "lang"),
+        _preload(playmodedb, playmode, "mode"),
+        _preload(playtypedb, playtype, "mode"),
+        _preload(channeldb, channelconnect, "mode"),
+        _preload(countdb, count, "mode"),
+        _preload(assdb, assistantdict, "assistant"),
+        _preload(authuserdb, authusers, "notes"),
+        _preload(skipdb, skipmode, value=False),
+        _preload(authdb, nonadmin, value=True),
+        return_exceptions=True,
+    )
+    loaded = sum(x for x in results if isinstance(x, int))
+    return loaded, time.monotonic() - start
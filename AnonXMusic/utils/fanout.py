@@ -0,0 +1,199 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict
+
+from pyrogram.errors import FloodWait
+
+import config
+from AnonXMusic.core.mongo import mongodb
+
+from ..logging import LOGGER
+
+jobsdb = mongodb.fanoutjobs
+
+# Seconds between checkpoint writes and progress callbacks.
+CHECKPOINT_INTERVAL = 10
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FanOut:
+    """
+    Runs `action(job, target)` for every target of an async iterator.
+
+    A bounded set of workers shares a token bucket. FloodWait defers only the
+    chat that hit it and halves the send rate, which then creeps back up on
+    successes. With a job_id, progress is checkpointed to mongo as the last
+    target before which everything has finished, so a restarted job can
+    continue from there.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        action,
+        rate: float,
+        workers: int,
+        job_id: str = None,
+        params: dict = None,
+        state: dict = None,
+        progress=None,
+        retries: int = 3,
+    ):
+        self.name = name
+        self.action = action
+        self.rate = rate
+        self.bucket = TokenBucket(rate)
+        self.workers = workers
+        self.job_id = job_id
+        self.params = params or {}
+        self.progress = progress
+        self.retries = retries
+        self.stats = Counter((state or {}).get("stats", {}))
+        self.cursor = (state or {}).get("cursor")
+        self.queue = asyncio.Queue()
+        self.room = asyncio.Semaphore(workers * 10)
+        # target -> finished, in dispatch order, for the checkpoint cursor
+        self.inflight = OrderedDict()
+        self.deferred = set()
+        self.retry = []
+        self.producing = True
+        self.done = asyncio.Event()
+        self.started = None
+
+    async def run(self, targets):
+        self.started = time.monotonic()
+        tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        ticker = asyncio.create_task(self._ticker())
+        await self._checkpoint()
+        try:
+            async for target in targets:
+                if target in self.inflight:
+                    continue
+                await self.room.acquire()
+                self.inflight[target] = False
+                self.queue.put_nowait((target, 0))
+            self.producing = False
+            if not self.inflight:
+                self.done.set()
+            await self.done.wait()
+        finally:
+            for task in tasks + [ticker]:
+                task.cancel()
+            for handle in self.retry:
+                handle.cancel()
+        await self._checkpoint(finished=True)
+        return self.stats
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            target, attempt = await self.queue.get()
+            self.deferred.discard(target)
+            await self.bucket.acquire()
+            try:
+                ok = await self.action(self, target)
+            except FloodWait as fw:
+                wait = int(fw.value)
+                self.stats["floodwaits"] += 1
+                self.bucket.rate = max(self.rate / 10, self.bucket.rate / 2)
+                if wait <= config.FANOUT_MAX_FLOOD and attempt < self.retries:
+                    self.deferred.add(target)
+                    self.retry.append(
+                        loop.call_later(
+                            wait, self.queue.put_nowait, (target, attempt + 1)
+                        )
+                    )
+                    continue
+                ok = False
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                ok = False
+            if ok:
+                self.bucket.rate = min(self.rate, self.bucket.rate + self.rate / 50)
+            self._finish(target, ok)
+
+    def _finish(self, target, ok):
+        self.stats["done" if ok else "failed"] += 1
+        self.inflight[target] = True
+        while self.inflight:
+            first, finished = next(iter(self.inflight.items()))
+            if not finished:
+                break
+            self.inflight.popitem(last=False)
+            self.cursor = first
+        self.room.release()
+        if not self.producing and not self.inflight:
+            self.done.set()
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.started if self.started else 0
+        finished = self.stats["done"] + self.stats["failed"]
+        return {
+            "done": self.stats["done"],
+            "failed": self.stats["failed"],
+            "deferred": len(self.deferred),
+            "floodwaits": self.stats["floodwaits"],
+            "rate": self.bucket.rate,
+            "speed": finished / elapsed if elapsed else 0,
+            "elapsed": int(elapsed),
+        }
+
+    async def _ticker(self):
+        while not await asyncio.sleep(CHECKPOINT_INTERVAL):
+            await self._checkpoint()
+            if self.progress:
+                try:
+                    await self.progress(self)
+                except Exception:
+                    pass
+
+    async def _checkpoint(self, finished: bool = False):
+        if not self.job_id:
+            return
+        try:
+            if finished:
+                await jobsdb.delete_one({"_id": self.job_id})
+                return
+            await jobsdb.update_one(
+                {"_id": self.job_id},
+                {
+                    "$set": {
+                        "name": self.name,
+                        "params": self.params,
+                        "cursor": self.cursor,
+                        "stats": dict(self.stats),
+                        "updated": time.time(),
+                    }
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            LOGGER(__name__).warning(f"Failed to checkpoint {self.job_id}: {e}")
+
+
+async def unfinished_jobs(name: str) -> list:
+    return [job async for job in jobsdb.find({"name": name})]
@@ -0,0 +1,115 @@
+from pymongo.errors import OperationFailure
+
+from AnonXMusic.utils.database import (
+    assdb,
+    authdb,
+    authuserdb,
+    autoenddb,
+    blacklist_chatdb,
+    blockeddb,
+    channeldb,
+    chatsdb,
+    countdb,
+    gbansdb,
+    langdb,
+    modeldb,
+    onoffdb,
+    playmodedb,
+    playtypedb,
+    skipdb,
+    sudoersdb,
+    usersdb,
+)
+
+from ..logging import LOGGER
+
+# (collection, field) pairs every lookup in utils/database.py filters on.
+INDEXES = [
+    (assdb, "chat_id"),
+    (authdb, "chat_id"),
+    (authuserdb, "chat_id"),
+    (autoenddb, "chat_id"),
+    (blacklist_chatdb, "chat_id"),
+    (blockeddb, "user_id"),
+    (channeldb, "chat_id"),
+    (chatsdb, "chat_id"),
+    (countdb, "chat_id"),
+    (gbansdb, "user_id"),
+    (langdb, "chat_id"),
+    (modeldb, "model"),
+    (onoffdb, "on_off"),
+    (playmodedb, "chat_id"),
+    (playtypedb, "chat_id"),
+    (skipdb, "chat_id"),
+    (sudoersdb, "sudo"),
+    (usersdb, "user_id"),
+]
+
+# Queries worth checking with explain, as (collection, filter).
+HOT_QUERIES = [
+    (assdb, {"chat_id": -1001}),
+    (authdb, {"chat_id": -1001}),
+    (authuserdb, {"chat_id": -1001}),
+    (blacklist_chatdb, {"chat_id": {"$lt": 0}}),
+    (blockeddb, {"user_id": 1}),
+    (blockeddb, {"user_id": {"$gt": 0}}),
+    (channeldb, {"chat_id": -1001}),
+    (chatsdb, {"chat_id": -1001}),
+    (chatsdb, {"chat_id": {"$lt": 0}}),
+    (countdb, {"chat_id": -1001}),
+    (gbansdb, {"user_id": 1}),
+    (gbansdb, {"user_id": {"$gt": 0}}),
+    (langdb, {"chat_id": -1001}),
+    (onoffdb, {"on_off": 1}),
+    (playmodedb, {"chat_id": -1001}),
+    (playtypedb, {"chat_id": -1001}),
+    (skipdb, {"chat_id": -1001}),
+    (usersdb, {"user_id": 1}),
+    (usersdb, {"user_id": {"$gt": 0}}),
+]
+
+
+async def ensure_indexes() -> int:
+    """Create the unique lookup indexes, falling back to plain ones on duplicate data."""
+    created = 0
+    for collection, field in INDEXES:
+        try:
+            await collection.create_index(field, unique=True)
+        except OperationFailure as e:
+            # Old data may hold duplicates from the racy find/insert that used
+            # to add served users/chats; a plain index still serves lookups.
+            LOGGER(__name__).warning(
+                f"Unique index on {collection.name}.{field} failed, using a plain one: {e}"
+            )
+            try:
+                await collection.create_index(field)
+            except Exception as e:
+                LOGGER(__name__).error(
+                    f"Index on {collection.name}.{field} failed: {e}"
+                )
+                continue
+        created += 1
+    return created
+
+
+def _stages(plan: dict) -> list:
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _stages(child)
+    return [x for x in stages if x]
+
+
+async def explain_queries() -> list:
+    """Run explain on HOT_QUERIES, returns (collection, filter, stages, collscan) rows."""
+    results = []
+    for collection, query in HOT_QUERIES:
+        try:
+            plan = await collection.find(query).explain()
+            winning = plan.get("queryPlanner", {}).get("winningPlan", {})
+            stages = _stages(winning)
+        except Exception as e:
+            stages = [f"error: {e}"]
+        results.append((collection.name, query, stages, "COLLSCAN" in stages))
+    return results
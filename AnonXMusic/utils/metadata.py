@@ -0,0 +1,109 @@
+import re
+import time
+from collections import OrderedDict
+
+import config
+from AnonXMusic.core.mongo import mongodb
+from AnonXMusic.utils.writebehind import writes
+
+metadb = mongodb.ytmetadata
+
+_vidid = re.compile(r"(?:v=|youtu\.be/|shorts/)([0-9A-Za-z_-]{11})")
+
+
+def normalize(query: str) -> str:
+    return " ".join(str(query).lower().split())
+
+
+def video_id_of(query: str):
+    match = _vidid.search(str(query))
+    return match.group(1) if match else None
+
+
+class MetadataCache:
+    """
+    TTL + LRU cache for YouTube search results.
+
+    Results are stored once per video id; searches only remember which ids
+    they resolved to, so a text search, a link lookup and a later details()
+    call for the same video all share one record.
+    """
+
+    def __init__(self, ttl: int, maxsize: int, persist: bool = False):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.persist = persist
+        self.records = OrderedDict()
+        self.queries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, store, key):
+        entry = store.get(key)
+        if entry is None:
+            return None
+        expiry, value = entry
+        if expiry < time.time():
+            store.pop(key, None)
+            return None
+        store.move_to_end(key)
+        return value
+
+    def _set(self, store, key, value, expiry=None):
+        store[key] = (expiry or time.time() + self.ttl, value)
+        store.move_to_end(key)
+        while len(store) > self.maxsize:
+            store.popitem(last=False)
+
+    async def _load(self, vidid: str):
+        try:
+            doc = await metadb.find_one({"_id": vidid})
+        except:
+            return None
+        if not doc or doc["expires"] < time.time():
+            return None
+        self._set(self.records, vidid, doc["result"], doc["expires"])
+        return doc["result"]
+
+    def peek(self, vidid: str):
+        """Return the in-memory record of a video without counting a lookup."""
+        return self._get(self.records, vidid)
+
+    async def get(self, query: str, limit: int = 1):
+        if limit == 1:
+            vidid = video_id_of(query)
+            if vidid:
+                result = self._get(self.records, vidid)
+                if result is None and self.persist:
+                    result = await self._load(vidid)
+                if result is not None:
+                    self.hits += 1
+                    return [result]
+        ids = self._get(self.queries, (normalize(query), limit))
+        if ids is not None:
+            results = [self._get(self.records, vidid) for vidid in ids]
+            if None not in results:
+                self.hits += 1
+                return results
+        self.misses += 1
+        return None
+
+    def put(self, query: str, limit: int, results: list):
+        if not results:
+            return
+        for result in results:
+            self._set(self.records, result["id"], result)
+            if self.persist:
+                writes.set(
+                    metadb,
+                    {"_id": result["id"]},
+                    {"result": result, "expires": time.time() + self.ttl},
+                )
+        self._set(
+            self.queries, (normalize(query), limit), [r["id"] for r in results]
+        )
+
+
+metacache = MetadataCache(
+    config.YT_CACHE_TTL, config.YT_CACHE_SIZE, config.YT_CACHE_MONGO
+)
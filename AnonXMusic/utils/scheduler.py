@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import time
+
+from ..logging import LOGGER
+
+
+class Scheduler:
+    """
+    Per-key deadlines kept on a heap.
+
+    Each key has at most one deadline: scheduling it again replaces the old
+    one and cancel() drops it, stale heap entries are skipped when they reach
+    the top. A single task sleeps until the earliest deadline, so nothing
+    runs between deadlines however many chats are tracked.
+    """
+
+    def __init__(self):
+        self.heap = []
+        # key -> sequence number of its live heap entry
+        self.jobs = {}
+        self.seq = itertools.count()
+        self.task = None
+        self.wake = None
+        # running callbacks, referenced until they finish
+        self.running = set()
+
+    def schedule(self, key, delay: float, callback, *args):
+        seq = next(self.seq)
+        self.jobs[key] = seq
+        heapq.heappush(self.heap, (time.monotonic() + delay, seq, key, callback, args))
+        self._compact()
+        self._start()
+        if self.heap[0][1] == seq:
+            self.wake.set()
+
+    def cancel(self, key):
+        self.jobs.pop(key, None)
+        self._compact()
+
+    def pending(self, key) -> bool:
+        return key in self.jobs
+
+    def _live(self, item) -> bool:
+        return self.jobs.get(item[2]) == item[1]
+
+    def _compact(self):
+        # Keep replaced/cancelled entries from piling up under churn.
+        if len(self.heap) > 2 * len(self.jobs) + 64:
+            self.heap = [item for item in self.heap if self._live(item)]
+            heapq.heapify(self.heap)
+
+    def _start(self):
+        if self.task and not self.task.done():
+            return
+        self.wake = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            while self.heap and not self._live(self.heap[0]):
+                heapq.heappop(self.heap)
+            timeout = self.heap[0][0] - time.monotonic() if self.heap else None
+            if timeout is None or timeout > 0:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, key, callback, args = heapq.heappop(self.heap)
+            del self.jobs[key]
+            task = asyncio.create_task(callback(*args))
+            self.running.add(task)
+            task.add_done_callback(functools.partial(self._done, key))
+
+    def _done(self, key, task):
+        self.running.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error:
+            LOGGER(__name__).warning(f"Scheduled job {key} failed: {error}")
+
+
+scheduler = Scheduler()
@@ -1,5 +1,4 @@
-import os
-
+from AnonXMusic.utils.stream.mediastore import mediastore
 from config import autoclean
 
 
@@ -7,12 +6,7 @@ async def auto_clean(popped):
     try:
         rem = popped["file"]
         autoclean.remove(rem)
-        count = autoclean.count(rem)
-        if count == 0:
-            if "vid_" not in rem or "live_" not in rem or "index_" not in rem:
-                try:
-                    os.remove(rem)
-                except:
-                    pass
     except:
         pass
+    # the file itself stays cached until the media store needs the space
+    mediastore.enforce()
@@ -0,0 +1,44 @@
+import time
+
+# Playback position of a queue entry, computed on demand from a monotonic
+# clock instead of being ticked every second:
+#   entry["played"] -> seconds played when the clock was last anchored
+#   entry["anchor"] -> time.monotonic() of that moment, None while paused
+
+
+def _position(entry: dict) -> float:
+    position = entry.get("played", 0)
+    anchor = entry.get("anchor")
+    if anchor is not None:
+        position += time.monotonic() - anchor
+    return position
+
+
+def played(entry: dict) -> int:
+    """Seconds of the entry played so far, capped at its duration."""
+    seconds = int(entry.get("seconds") or 0)
+    if seconds == 0:
+        return int(entry.get("played", 0))
+    return int(min(_position(entry), seconds))
+
+
+def start(entry: dict, position: float = 0):
+    entry["played"] = position
+    entry["anchor"] = time.monotonic()
+
+
+def seek(entry: dict, position: float):
+    entry["played"] = max(position, 0)
+    if entry.get("anchor") is not None:
+        entry["anchor"] = time.monotonic()
+
+
+def pause(entry: dict):
+    if entry.get("anchor") is not None:
+        entry["played"] = _position(entry)
+        entry["anchor"] = None
+
+
+def resume(entry: dict):
+    if entry.get("anchor") is None:
+        entry["anchor"] = time.monotonic()
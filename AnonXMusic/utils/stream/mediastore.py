@@ -0,0 +1,138 @@
+import os
+import time
+from collections import Counter, OrderedDict
+
+import config
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.misc import db
+
+
+def media_id(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class MediaStore:
+    """
+    Index of the files kept in downloads/.
+
+    Downloads are already named after their media id
+    (``downloads/{video_id}.{ext}``), so the file name is the content key.
+    Files are kept in least-recently-used order, and once the index grows
+    past the byte budget the oldest files that no queue refers to are removed.
+    """
+
+    def __init__(self, root: str, budget: int):
+        self.root = root
+        self.budget = budget
+        self.files = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _index(self, path: str, size: int, atime: float = None):
+        self._drop(path)
+        self.files[path] = {"size": size, "atime": atime or time.time()}
+        self.size += size
+
+    def _drop(self, path: str):
+        old = self.files.pop(path, None)
+        if old:
+            self.size -= old["size"]
+
+    def scan(self):
+        entries = []
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                path = os.path.realpath(os.path.join(self.root, name))
+                if name.startswith(".") or name.endswith(".part"):
+                    continue
+                if not os.path.isfile(path):
+                    continue
+                stat = os.stat(path)
+                entries.append((stat.st_atime, path, stat.st_size))
+        for atime, path, size in sorted(entries):
+            self._index(path, size, atime)
+        LOGGER(__name__).info(
+            f"Media Store Indexed {len(self.files)} Files ({self.size} bytes) In {self.root}/."
+        )
+        self.enforce()
+
+    def add(self, file_path: str):
+        path = os.path.realpath(file_path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        self._index(path, size)
+        self.enforce()
+
+    def find(self, candidates):
+        """Return the first existing file of the candidates, counting a hit or a miss."""
+        for file_path in candidates:
+            path = os.path.realpath(file_path)
+            if not os.path.isfile(path):
+                self._drop(path)
+                continue
+            self.hits += 1
+            if path in self.files:
+                self.files[path]["atime"] = time.time()
+                self.files.move_to_end(path)
+            else:
+                self._index(path, os.path.getsize(path))
+            return file_path
+        self.misses += 1
+        return None
+
+    def references(self) -> Counter:
+        refs = Counter()
+        for check in db.values():
+            for entry in check:
+                for key in ("file", "prefetched", "speed_path"):
+                    value = entry.get(key)
+                    if value and isinstance(value, str):
+                        refs[os.path.realpath(value)] += 1
+                if entry.get("vidid"):
+                    refs[str(entry["vidid"])] += 1
+        return refs
+
+    def is_referenced(self, path: str, refs: Counter) -> bool:
+        return bool(refs[path] or refs[media_id(path)])
+
+    def evict(self, path: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        self._drop(path)
+        self.evictions += 1
+        return True
+
+    def enforce(self, max_age: int = None):
+        """Evict unreferenced files, oldest first, until under budget and none older than max_age."""
+        refs = self.references()
+        now = time.time()
+        for path, meta in list(self.files.items()):
+            expired = max_age is not None and now - meta["atime"] > max_age
+            if self.size <= self.budget and not expired:
+                break
+            if self.is_referenced(path, refs):
+                continue
+            self.evict(path)
+
+    def stats(self) -> dict:
+        refs = self.references()
+        return {
+            "files": len(self.files),
+            "size": self.size,
+            "budget": self.budget,
+            "referenced": sum(1 for path in self.files if self.is_referenced(path, refs)),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+mediastore = MediaStore("downloads", config.MEDIA_STORE_LIMIT)
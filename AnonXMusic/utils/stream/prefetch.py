@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import config
+from AnonXMusic import YouTube
+from AnonXMusic.misc import db
+
+semaphore = asyncio.Semaphore(config.PREFETCH_WORKERS)
+# prefetched file path -> size in bytes, for files not played yet
+prefetched = {}
+# running fetch tasks, kept so they are not garbage collected mid download
+tasks = set()
+# downloads in progress, counted against the budget at an average track size
+downloading = 0
+
+
+def is_queued(chat_id, entry) -> bool:
+    return any(item is entry for item in db.get(chat_id) or [])
+
+
+def pending_bytes() -> int:
+    queued = {item.get("prefetched") for check in db.values() for item in check}
+    for file_path in list(prefetched):
+        if file_path not in queued:
+            prefetched.pop(file_path, None)
+    done = sum(prefetched.values())
+    average = done // len(prefetched) if prefetched else config.PREFETCH_ESTIMATE
+    return done + downloading * average
+
+
+async def fetch(chat_id, entry):
+    global downloading
+    file_path = None
+    async with semaphore:
+        if is_queued(chat_id, entry) and pending_bytes() < config.PREFETCH_DISK_LIMIT:
+            downloading += 1
+            try:
+                file_path, direct = await YouTube.download(
+                    entry["vidid"],
+                    None,
+                    videoid=True,
+                    video=True if str(entry["streamtype"]) == "video" else False,
+                    stream=False,
+                )
+                if not direct:
+                    file_path = None
+            except:
+                file_path = None
+            finally:
+                downloading -= 1
+    if not file_path or not os.path.isfile(file_path):
+        entry["prefetched"] = None
+        return
+    entry["prefetched"] = file_path
+    prefetched[file_path] = os.path.getsize(file_path)
+
+
+def prefetch(chat_id):
+    """Start background downloads for the next queued youtube tracks of a chat."""
+    check = db.get(chat_id)
+    if not check:
+        return
+    for entry in check[1 : config.PREFETCH_TRACKS + 1]:
+        if "vid_" not in entry["file"]:
+            continue
+        if entry.get("prefetched") is not None:
+            continue
+        # False marks a download in progress, the path replaces it once done
+        entry["prefetched"] = False
+        task = asyncio.create_task(fetch(chat_id, entry))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+def take_prefetched(entry):
+    """Return the ready file of a queue entry, if it was prefetched."""
+    file_path = entry.get("prefetched")
+    if not file_path:
+        return None
+    prefetched.pop(file_path, None)
+    if not os.path.isfile(file_path):
+        return None
+    return file_path
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+
+import config
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.utils.scheduler import scheduler
+
+
+class Probe:
+    """
+    ffprobe metadata of media files.
+
+    Probes run as async subprocesses, at most PROBE_WORKERS at a time. The
+    duration, codec and bitrate of local files are cached under their real
+    path together with the mtime and size they were probed at, and written
+    to a json file next to the media store so a file is only probed again
+    once it changes. Urls are probed every time.
+    """
+
+    def __init__(self, cache_file: str, workers: int):
+        self.cache_file = cache_file
+        self.semaphore = asyncio.Semaphore(workers)
+        # real path -> {"mtime", "size", "duration", "codec", "bitrate"}
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        try:
+            with open(self.cache_file) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = {}
+        except Exception as e:
+            LOGGER(__name__).warning(f"Ignoring probe cache {self.cache_file}: {e}")
+            entries = {}
+        self.entries = {path: entry for path, entry in entries.items() if os.path.isfile(path)}
+        LOGGER(__name__).info(f"Probe Cache Loaded {len(self.entries)} Files.")
+
+    async def save(self):
+        # The file is written in a thread from a snapshot, so probes can keep
+        # adding entries meanwhile.
+        await asyncio.to_thread(self._write, dict(self.entries))
+
+    def _write(self, entries: dict):
+        entries = {path: entry for path, entry in entries.items() if os.path.isfile(path)}
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        temp = f"{self.cache_file}.part"
+        with open(temp, "w") as f:
+            json.dump(entries, f)
+        os.replace(temp, self.cache_file)
+
+    async def _ffprobe(self, target: str) -> dict:
+        async with self.semaphore:
+            proc = await asyncio.create_subprocess_exec(
+                "ffprobe",
+                "-loglevel",
+                "quiet",
+                "-print_format",
+                "json",
+                "-show_format",
+                "-show_streams",
+                target,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            try:
+                out, _ = await asyncio.wait_for(proc.communicate(), config.PROBE_TIMEOUT)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                return {}
+        try:
+            return json.loads(out)
+        except ValueError:
+            return {}
+
+    @staticmethod
+    def _parse(data: dict) -> dict:
+        fmt = data.get("format", {})
+        streams = data.get("streams", [])
+        duration = fmt.get("duration")
+        if duration is None:
+            duration = next((s["duration"] for s in streams if "duration" in s), None)
+        audio = [s for s in streams if s.get("codec_type") == "audio"]
+        codec = next((s.get("codec_name") for s in audio or streams), None)
+        bitrate = fmt.get("bit_rate")
+        return {
+            "duration": float(duration) if duration is not None else None,
+            "codec": codec,
+            "bitrate": int(bitrate) if bitrate and str(bitrate).isdigit() else None,
+        }
+
+    async def info(self, target: str) -> dict:
+        """Duration (seconds), codec and bitrate of a file or url, values None if unknown."""
+        path = os.path.realpath(target)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self._parse(await self._ffprobe(target))
+        entry = self.entries.get(path)
+        if (
+            entry
+            and entry["mtime"] == stat.st_mtime_ns
+            and entry["size"] == stat.st_size
+        ):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = self._parse(await self._ffprobe(path))
+        if entry["duration"] is not None:
+            self._store(path, stat, entry)
+        return entry
+
+    def record(self, target: str, duration: float, codec=None, bitrate=None):
+        """Cache metadata already known for a file, e.g. from the ffmpeg run that wrote it."""
+        path = os.path.realpath(target)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._store(path, stat, {"duration": duration, "codec": codec, "bitrate": bitrate})
+
+    def _store(self, path: str, stat, entry: dict):
+        entry.update(mtime=stat.st_mtime_ns, size=stat.st_size)
+        self.entries[path] = entry
+        # New entries are written out together, a few seconds later.
+        if not scheduler.pending("probe-save"):
+            scheduler.schedule("probe-save", 10, self.save)
+
+    async def duration(self, target: str):
+        return (await self.info(target))["duration"]
+
+
+probe = Probe("downloads/.probes.json", config.PROBE_WORKERS)
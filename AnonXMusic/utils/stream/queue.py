@@ -1,8 +1,10 @@
-import asyncio
 from typing import Union
 
 from AnonXMusic.misc import db
-from AnonXMusic.utils.formatters import check_duration, seconds_to_min
+from AnonXMusic.utils.stream import clock
+from AnonXMusic.utils.formatters import seconds_to_min
+from AnonXMusic.utils.stream.prefetch import prefetch
+from AnonXMusic.utils.stream.probe import probe
 from config import autoclean, time_to_seconds
 
 
@@ -44,7 +46,10 @@ async def put_queue(
             db[chat_id].append(put)
     else:
         db[chat_id].append(put)
+    if db[chat_id][0] is put:
+        clock.start(put)
     autoclean.append(file)
+    prefetch(chat_id)
 
 
 async def put_queue_index(
@@ -60,9 +65,7 @@ async def put_queue_index(
 ):
     if "20.212.146.162" in vidid:
         try:
-            dur = await asyncio.get_event_loop().run_in_executor(
-                None, check_duration, vidid
-            )
+            dur = int(await probe.duration(vidid))
             duration = seconds_to_min(dur)
         except:
             duration = "ᴜʀʟ sᴛʀᴇᴀᴍ"
@@ -89,3 +92,5 @@ async def put_queue_index(
             db[chat_id].append(put)
     else:
         db[chat_id].append(put)
+    if db[chat_id][0] is put:
+        clock.start(put)
@@ -0,0 +1,205 @@
+import asyncio
+import itertools
+import os
+import shutil
+
+import config
+from AnonXMusic.logging import LOGGER
+from AnonXMusic.misc import db
+from AnonXMusic.utils.exceptions import AssistantErr
+from AnonXMusic.utils.stream.mediastore import MediaStore, media_id
+from AnonXMusic.utils.stream.probe import probe
+
+
+class Render:
+    """A speed variant being written by ffmpeg, readable while it grows."""
+
+    def __init__(self, source: str, speed: str, output: str):
+        self.source = source
+        self.speed = speed
+        self.output = output
+        self.part = f"{output}.part"
+        # seconds of the variant written so far
+        self.rendered = 0.0
+        self.waiters = 0
+        self.started = False
+        self.finished = False
+        self.failed = False
+        self.proc = None
+        self.changed = asyncio.Condition()
+
+    async def notify(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def wait(self, position: float = None):
+        """Wait until the variant is done, or written past the position if given."""
+        async with self.changed:
+            await self.changed.wait_for(
+                lambda: self.finished
+                or self.failed
+                or (
+                    position is not None
+                    and self.rendered >= position + config.SPEED_RENDER_LEAD
+                )
+            )
+
+
+class SpeedVariants:
+    """
+    Speed adjusted copies of downloads, shared by every chat.
+
+    Variants are rendered in the background by SPEED_WORKERS ffmpeg processes,
+    jobs wanted by more chats first. Playback may start as soon as the render
+    has passed the current position, the player follows the file while it is
+    still being written. Finished variants are kept in playback/ under a byte
+    budget, least recently used first, with the duration ffmpeg reported so
+    they never need probing.
+    """
+
+    def __init__(self, root: str, budget: int, workers: int):
+        self.root = root
+        self.store = MediaStore(root, budget)
+        self.workers = workers
+        self.queue = None
+        self.tasks = []
+        self.seq = itertools.count()
+        # (source, speed) -> Render, while queued or rendering
+        self.jobs = {}
+
+    def path(self, source: str, speed: str) -> str:
+        return os.path.join(self.root, f"{media_id(source)}@{speed}.mkv")
+
+    def scan(self):
+        os.makedirs(self.root, exist_ok=True)
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            # Leftovers of the old playback/{speed}/ layout and broken renders.
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.endswith(".part"):
+                os.remove(path)
+        self.store.scan()
+
+    def _start(self):
+        if self.queue is None:
+            self.queue = asyncio.PriorityQueue()
+            self.tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+
+    def _submit(self, job: Render):
+        # Re-queued with a better priority whenever another chat asks for it,
+        # the stale entries are skipped once the job has started.
+        self.queue.put_nowait((-job.waiters, next(self.seq), job))
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self.queue.get()
+            if job.started:
+                continue
+            job.started = True
+            try:
+                await self._render(job)
+            except Exception as e:
+                LOGGER(__name__).warning(f"Speed render of {job.source} failed: {e}")
+                job.failed = True
+            self.jobs.pop((job.source, job.speed), None)
+            if job.failed:
+                try:
+                    os.remove(job.part)
+                except OSError:
+                    pass
+            await job.notify()
+
+    async def _render(self, job: Render):
+        job.proc = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-y",
+            "-nostats",
+            "-loglevel",
+            "error",
+            "-i",
+            job.source,
+            "-filter:v",
+            f"setpts={1 / float(job.speed)}*PTS",
+            "-filter:a",
+            f"atempo={job.speed}",
+            "-f",
+            "matroska",
+            "-progress",
+            "pipe:1",
+            job.part,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        async for line in job.proc.stdout:
+            key, _, value = line.decode().strip().partition("=")
+            if key == "out_time_us" and value.isdigit():
+                job.rendered = int(value) / 1000000
+                await job.notify()
+        if await job.proc.wait() != 0:
+            job.failed = True
+            return
+        os.replace(job.part, job.output)
+        probe.record(job.output, duration=job.rendered)
+        self.store.add(job.output)
+        job.finished = True
+        # Chats already playing the partial file keep its open handle, later
+        # seeks should use the finished one.
+        for check in db.values():
+            for entry in check:
+                if entry.get("speed_path") == job.part:
+                    entry["speed_path"] = job.output
+
+    async def duration(self, path: str) -> int:
+        return int(await probe.duration(path))
+
+    async def get(self, source: str, speed: str, position: float, estimate: int):
+        """
+        Return (path, duration, render) of the speed variant of a source once
+        it can be played from position (in variant seconds). render is the
+        running Render when the path is the partial file, otherwise None.
+        """
+        output = self.path(source, speed)
+        if self.store.find([output]):
+            return output, await self.duration(output), None
+        self._start()
+        key = (source, speed)
+        job = self.jobs.get(key)
+        if not job:
+            job = self.jobs[key] = Render(source, speed, output)
+        job.waiters += 1
+        if not job.started:
+            self._submit(job)
+        try:
+            await job.wait(position)
+        finally:
+            job.waiters -= 1
+        if job.failed:
+            raise AssistantErr("Speed render failed")
+        if job.finished:
+            return output, int(job.rendered), None
+        return job.part, estimate, job
+
+    def stats(self) -> dict:
+        stats = self.store.stats()
+        stats["rendering"] = sum(1 for job in self.jobs.values() if job.started)
+        stats["queued"] = sum(1 for job in self.jobs.values() if not job.started)
+        return stats
+
+    def shutdown(self):
+        for task in self.tasks:
+            task.cancel()
+        for job in self.jobs.values():
+            if job.proc and job.proc.returncode is None:
+                try:
+                    job.proc.kill()
+                except ProcessLookupError:
+                    pass
+
+
+speedvariants = SpeedVariants(
+    "playback", config.SPEED_CACHE_LIMIT, config.SPEED_WORKERS
+)
@@ -1,17 +1,30 @@
+import asyncio
+import io
+import multiprocessing
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor
 
-import aiofiles
-import aiohttp
-from PIL import Image, ImageDraw, ImageOps, ImageFilter
-from unidecode import unidecode
-from ytSearch import VideosSearch
+from PIL import Image, ImageDraw, ImageFilter
 
-from AnonXMusic import app
+import config
+from AnonXMusic import YouTube
+from AnonXMusic.core.http import get_session
+from AnonXMusic.core.mongo import mongodb
+from AnonXMusic.platforms.Youtube import single_flight
+from AnonXMusic.utils.stream.mediastore import MediaStore
+from AnonXMusic.utils.writebehind import writes
 from config import YOUTUBE_IMG_URL
 
-# Ensure cache directory exists
-os.makedirs("cache", exist_ok=True)
+thumbdb = mongodb.thumbfileids
+
+# Thumbnails get their own directory, the rest of cache/ is not budgeted
+THUMBS_DIR = "cache/thumbs"
+os.makedirs(THUMBS_DIR, exist_ok=True)
+
+TEMPLATES = ["AnonXMusic/assets/new_template.jpg", "AnonXMusic/assets/template.jpg"]
+EFFECTS_PADDING = 15  # Padding for shadow and border around the artwork
+EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+
 
 def changeImageSize(maxWidth, maxHeight, image):
     widthRatio = maxWidth / image.size[0]
@@ -33,10 +46,225 @@ def clear(text):
     return title.strip()
 
 
+def thumb_path(videoid) -> str:
+    return f"{THUMBS_DIR}/{videoid}.{EXTENSIONS.get(config.THUMB_FORMAT, 'jpg')}"
+
+
+class Layers:
+    """
+    Everything about a render that does not depend on the song artwork.
+
+    The template with the shadow and border already composited in, the
+    rounded artwork mask and the blurred glow are built once per process,
+    so a render is one resize, one paste and one composite.
+    """
+
+    def __init__(self, template_path: str):
+        template = Image.open(template_path).convert("RGBA")
+        template_width, template_height = template.size
+
+        # Precisely sized to cover only the girl surrounded by flowers
+        self.width = int(template_width * 0.44)
+        self.height = int(template_width * 0.22)
+        # Positioned to exactly overlay the girl with flowers
+        self.x = int(template_width * 0.28)
+        self.y = int(template_height * 0.15)
+        # Softer corners for natural framing
+        radius = int(self.width * 0.09)
+        pad = EFFECTS_PADDING
+        canvas = (self.width + pad * 2, self.height + pad * 2)
+
+        # Shadow (larger rounded rectangle behind artwork)
+        shadow = Image.new("RGBA", canvas, (0, 0, 0, 0))
+        ImageDraw.Draw(shadow).rounded_rectangle(
+            [(pad - 5, pad - 5), (pad + self.width + 5, pad + self.height + 5)],
+            radius + 5,
+            fill=(0, 0, 0, 100),
+        )
+        shadow = shadow.filter(ImageFilter.GaussianBlur(10))
+
+        # Border (slightly larger rounded rectangle around artwork)
+        border = Image.new("RGBA", (self.width + 6, self.height + 6), (0, 0, 0, 0))
+        ImageDraw.Draw(border).rounded_rectangle(
+            [(0, 0), (self.width + 6, self.height + 6)],
+            radius + 3,
+            fill=(255, 255, 255, 0),
+            outline=(255, 255, 255, 180),
+            width=3,
+        )
+
+        effects = Image.new("RGBA", canvas, (0, 0, 0, 0))
+        effects.paste(shadow, (0, 0), shadow)
+        effects.paste(border, (pad - 3, pad - 3), border)
+        template.paste(effects, (self.x - pad, self.y - pad), effects)
+        self.background = template
+
+        # Mask for artwork with rounded corners
+        self.mask = Image.new("L", (self.width, self.height), 0)
+        ImageDraw.Draw(self.mask).rounded_rectangle(
+            [(0, 0), (self.width, self.height)], radius, fill=255
+        )
+
+        # Subtle blue glow laid over the artwork edges
+        glow = Image.new("RGBA", canvas, (0, 0, 0, 0))
+        ImageDraw.Draw(glow).rounded_rectangle(
+            [(pad, pad), (pad + self.width, pad + self.height)],
+            radius,
+            fill=(255, 255, 255, 0),
+            outline=(180, 180, 255, 60),
+            width=5,
+        )
+        self.glow = glow.filter(ImageFilter.GaussianBlur(5))
+
+    def render(self, artwork: bytes, output: str, fmt: str, quality: int, max_width: int):
+        song_art = Image.open(io.BytesIO(artwork)).convert("RGBA")
+        song_art = song_art.resize((self.width, self.height), Image.LANCZOS)
+        song_art.putalpha(self.mask)
+
+        image = self.background.copy()
+        image.paste(song_art, (self.x, self.y), song_art)
+        image.alpha_composite(
+            self.glow, (self.x - EFFECTS_PADDING, self.y - EFFECTS_PADDING)
+        )
+        image = image.convert("RGB")
+        if image.width > max_width:
+            image = image.resize(
+                (max_width, int(image.height * max_width / image.width)), Image.LANCZOS
+            )
+
+        temp = f"{output}.part"
+        image.save(temp, format=fmt.upper(), quality=quality, optimize=True)
+        os.replace(temp, output)
+
+
+_layers = None
+
+
+def _load_layers():
+    global _layers
+    if _layers is None:
+        for path in TEMPLATES:
+            if os.path.exists(path):
+                _layers = Layers(path)
+                break
+    return _layers is not None
+
+
+def _render(artwork: bytes, output: str, fmt: str, quality: int, max_width: int):
+    if not _load_layers():
+        return False
+    _layers.render(artwork, output, fmt, quality, max_width)
+    return True
+
+
+class ThumbRenderer:
+    """Runs thumbnail renders in a pool of worker processes."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool = None
+
+    def start(self):
+        # The pool only forks on its first submit, so submit a warm-up per
+        # worker here. Called from __main__ before the clients start, this
+        # forks the workers before the bot's threads are running, and each
+        # has its layers built before the first real render arrives.
+        if self.pool:
+            return
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_load_layers,
+        )
+        for _ in range(self.workers):
+            self.pool.submit(_load_layers)
+
+    async def render(self, artwork: bytes, output: str) -> bool:
+        self.start()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.pool,
+            _render,
+            artwork,
+            output,
+            config.THUMB_FORMAT,
+            config.THUMB_QUALITY,
+            config.THUMB_MAX_WIDTH,
+        )
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+
+renderer = ThumbRenderer(config.THUMB_WORKERS)
+
+
+class ThumbCache:
+    """
+    Rendered thumbnails in cache/thumbs/ and the telegram file_id of their first upload.
+
+    Files are kept under a byte budget by a MediaStore. Once a thumbnail has
+    been sent, later sends reuse its file_id, so the file itself may be
+    evicted without the thumbnail being rendered or uploaded again.
+    """
+
+    def __init__(self, root: str, budget: int):
+        self.store = MediaStore(root, budget)
+        # thumbnail path -> telegram file_id
+        self.file_ids = {}
+        self.reused = 0
+
+    async def load(self):
+        async for doc in thumbdb.find({"file_id": {"$ne": None}}):
+            self.file_ids[doc["_id"]] = doc["file_id"]
+        self.store.scan()
+
+    def find(self, path: str):
+        if self.store.find([path]) or path in self.file_ids:
+            return path
+        return None
+
+    def add(self, path: str):
+        self.store.add(path)
+
+    def managed(self, photo) -> bool:
+        if not isinstance(photo, str):
+            return False
+        return photo in self.file_ids or os.path.realpath(photo) in self.store.files
+
+    def file_id(self, photo):
+        if not isinstance(photo, str):
+            return None
+        file_id = self.file_ids.get(photo)
+        if file_id:
+            self.reused += 1
+        return file_id
+
+    def media(self, photo):
+        """The photo itself while on disk, else its file_id, for senders other than send_photo."""
+        if self.managed(photo) and not os.path.isfile(photo):
+            return self.file_id(photo) or photo
+        return photo
+
+    def remember(self, photo, message):
+        if not self.managed(photo) or not getattr(message, "photo", None):
+            return
+        self.file_ids[photo] = message.photo.file_id
+        writes.set(thumbdb, {"_id": photo}, {"file_id": message.photo.file_id})
+
+    def forget(self, photo):
+        if self.file_ids.pop(photo, None):
+            writes.set(thumbdb, {"_id": photo}, {"file_id": None})
+
+
+thumbcache = ThumbCache(THUMBS_DIR, config.THUMB_CACHE_LIMIT)
+
+
 async def get_thumb(videoid, user_id=None, force_update=False):
     """
     Generate a thumbnail for a YouTube video using a template image
-    
+
     Args:
         videoid (str): YouTube video ID
         user_id (int, optional): User ID (kept for compatibility)
@@ -45,185 +273,52 @@ async def get_thumb(videoid, user_id=None, force_update=False):
     Returns:
         str: Path to thumbnail image or fallback URL
     """
-    # Make sure cache directory exists
-    os.makedirs("cache", exist_ok=True)
-    
-    # Return cached version if it exists and not forcing update
-    if os.path.isfile(f"cache/{videoid}.png") and not force_update:
-        return f"cache/{videoid}.png"
+    output = thumb_path(videoid)
+    # Return cached version (on disk or already uploaded) unless forcing update
+    if not force_update and thumbcache.find(output):
+        return output
+    thumbcache.forget(output)
+    # Tracks starting in several chats at once share a single render.
+    return await single_flight(("thumb", videoid), lambda: _make_thumb(videoid))
 
+
+async def _make_thumb(videoid):
     url = f"https://www.youtube.com/watch?v={videoid}"
     try:
-        results = VideosSearch(url, limit=1)
-        results_data = await results.next()
-        
-        if not results_data or not results_data.get("result"):
+        results_data = await YouTube.search(url)
+        if not results_data:
             print(f"No results found for {videoid}")
             return YOUTUBE_IMG_URL
-        
-        result = results_data["result"][0]
-            
-        # Extract video details with error handling
-        thumbnail = YOUTUBE_IMG_URL
-        channel = "Unknown Artist"
-        
+        result = results_data[0]
+
         try:
             thumbnail = result["thumbnails"][0]["url"].split("?")[0]
         except Exception as e:
             print(f"Error processing thumbnail URL: {e}")
-            
-        try:
-            channel = result.get("channel", {}).get("name", "Unknown Artist")
-        except Exception as e:
-            print(f"Error processing channel name: {e}")
+            return YOUTUBE_IMG_URL
 
         # Download thumbnail
-        temp_thumb = f"cache/thumb{videoid}.png"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(thumbnail) as resp:
-                    if resp.status == 200:
-                        f = await aiofiles.open(temp_thumb, mode="wb")
-                        await f.write(await resp.read())
-                        await f.close()
-                    else:
-                        print(f"Failed to download thumbnail: HTTP {resp.status}")
-                        return YOUTUBE_IMG_URL
+            async with get_session().get(thumbnail) as resp:
+                if resp.status != 200:
+                    print(f"Failed to download thumbnail: HTTP {resp.status}")
+                    return YOUTUBE_IMG_URL
+                artwork = await resp.read()
         except Exception as e:
             print(f"Error downloading thumbnail: {e}")
             return YOUTUBE_IMG_URL
 
+        output = thumb_path(videoid)
         try:
-            # Load template image and print dimensions for debugging
-            template_path = "AnonXMusic/assets/new_template.jpg"
-            if not os.path.exists(template_path):
-                print(f"New template image not found at {template_path}")
-                # Fall back to original template if new one is not found
-                template_path = "AnonXMusic/assets/template.jpg"
-                if not os.path.exists(template_path):
-                    print(f"Template image not found at {template_path}")
-                    return YOUTUBE_IMG_URL
-                
-            template = Image.open(template_path).convert("RGBA")
-            template_width, template_height = template.size
-            print(f"Template dimensions: {template_width}x{template_height}")
-            
-            # Load the song artwork
-            song_art = Image.open(temp_thumb).convert("RGBA")
-            
-            # Precisely sized to cover only the girl surrounded by flowers
-            artwork_width = int(template_width * 0.44)    # Width to cover just the floral area
-            artwork_height = int(template_width * 0.22)   # Shorter height to match the flower-surrounded area
-            
-            # Positioned to exactly overlay the girl with flowers
-            artwork_x = int(template_width * 0.28)        # Repositioned to center on the girl image
-            artwork_y = int(template_height * 0.15)       # Fine-tuned vertical position for perfect centering
-            
-            # Create a mask for rounded corners - matching the flower area's shape
-            corner_radius = int(artwork_width * 0.10)     # Corner radius to match the flower area's contour
-            
-            # Resize the song artwork to fit in the template
-            # Use LANCZOS for high-quality resizing
-            song_art = song_art.resize((artwork_width, artwork_height), Image.LANCZOS)
-            
-            # Create a mask for rounded corners - softer corners for natural framing
-            corner_radius = int(artwork_width * 0.09)     # Increased radius for softer framing effect
-            
-            # Create a larger canvas for the artwork to add effects
-            effects_padding = 15  # Padding for shadow and border
-            art_with_effects = Image.new(
-                "RGBA", 
-                (artwork_width + effects_padding*2, artwork_height + effects_padding*2),
-                (0, 0, 0, 0)
-            )
-            
-            # Create shadow first (larger rounded rectangle behind artwork)
-            shadow = Image.new("RGBA", art_with_effects.size, (0, 0, 0, 0))
-            shadow_draw = ImageDraw.Draw(shadow)
-            shadow_draw.rounded_rectangle(
-                [(effects_padding-5, effects_padding-5), 
-                 (effects_padding + artwork_width+5, effects_padding + artwork_height+5)],
-                corner_radius+5,
-                fill=(0, 0, 0, 100)  # Semi-transparent black for shadow
-            )
-            # Blur the shadow for softer effect
-            shadow = shadow.filter(ImageFilter.GaussianBlur(10))
-            
-            # Add shadow to the canvas
-            art_with_effects.paste(shadow, (0, 0), shadow)
-            
-            # Create mask for artwork with rounded corners
-            mask = Image.new("L", (artwork_width, artwork_height), 0)
-            mask_draw = ImageDraw.Draw(mask)
-            mask_draw.rounded_rectangle([(0, 0), (artwork_width, artwork_height)], corner_radius, fill=255)
-            
-            # Apply mask to song artwork
-            song_art.putalpha(mask)
-            
-            # Create border (slightly larger rounded rectangle around artwork)
-            border_img = Image.new("RGBA", (artwork_width+6, artwork_height+6), (0, 0, 0, 0))
-            border_draw = ImageDraw.Draw(border_img)
-            border_draw.rounded_rectangle(
-                [(0, 0), (artwork_width+6, artwork_height+6)],
-                corner_radius+3,
-                fill=(255, 255, 255, 0),  # Transparent fill
-                outline=(255, 255, 255, 180),  # White border
-                width=3  # Border width
-            )
-            
-            # Add border to effects canvas
-            art_with_effects.paste(border_img, (effects_padding-3, effects_padding-3), border_img)
-            
-            # Add artwork on top of effects
-            art_with_effects.paste(song_art, (effects_padding, effects_padding), song_art)
-            
-            # Optional: Add subtle glow effect by overlaying a colored layer
-            glow = Image.new("RGBA", art_with_effects.size, (0, 0, 0, 0))
-            glow_draw = ImageDraw.Draw(glow)
-            glow_draw.rounded_rectangle(
-                [(effects_padding, effects_padding), 
-                 (effects_padding + artwork_width, effects_padding + artwork_height)],
-                corner_radius,
-                fill=(255, 255, 255, 0),  # Transparent fill
-                outline=(180, 180, 255, 60),  # Subtle blue glow
-                width=5  # Glow width
-            )
-            glow = glow.filter(ImageFilter.GaussianBlur(5))
-            
-            # Blend glow with artwork
-            art_with_effects = Image.alpha_composite(art_with_effects, glow)
-            
-            # Paste the artwork with effects onto the template
-            # Adjust position to account for the effects padding
-            template.paste(
-                art_with_effects, 
-                (artwork_x - effects_padding, artwork_y - effects_padding), 
-                art_with_effects
-            )
-            
-            # Save the final image
-            final_image_path = f"cache/{videoid}.png"
-            template.convert("RGB").save(final_image_path)
-            
-            # Clean up temp file
-            try:
-                if os.path.exists(temp_thumb):
-                    os.remove(temp_thumb)
-            except Exception as e:
-                print(f"Error removing temporary thumbnail: {e}")
-                
-            return final_image_path
-            
+            if not await renderer.render(artwork, output):
+                print("Template image not found")
+                return YOUTUBE_IMG_URL
         except Exception as e:
             print(f"Error processing image: {e}")
-            # Try to clean up temp file in case of failure
-            try:
-                if os.path.exists(temp_thumb):
-                    os.remove(temp_thumb)
-            except:
-                pass
             return YOUTUBE_IMG_URL
+        thumbcache.add(output)
+        return output
 
     except Exception as e:
         print(f"Error in get_thumb: {e}")
-        return YOUTUBE_IMG_URL
\ No newline at end of file
+        return YOUTUBE_IMG_URL
@@ -0,0 +1,156 @@
+import asyncio
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import config
+
+from ..logging import LOGGER
+
+
+class WriteBehind:
+    """
+    Write-behind queue for settings documents.
+
+    Callers update their in-memory dict first and hand the matching mongo
+    write to the queue. Writes to the same document are merged, and the
+    queue is flushed with one bulk_write per collection every few seconds,
+    when it grows past its batch size, or on shutdown. Writes that fail are
+    retried with later flushes, up to `retries` times each.
+    """
+
+    def __init__(self, interval: float, batch: int, retries: int):
+        self.interval = interval
+        self.batch = batch
+        self.retries = retries
+        # (collection name, filter) -> [collection, filter, update, failed attempts]
+        self.pending = {}
+        self.task = None
+        self.wake = None
+        self.lock = None
+        self.flushed = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @staticmethod
+    def _key(collection, query: dict):
+        return collection.name, tuple(sorted(query.items()))
+
+    def _queue(self, collection, query: dict, operator: str, fields: dict):
+        key = self._key(collection, query)
+        op = self.pending.get(key)
+        if op is None:
+            op = self.pending[key] = [collection, dict(query), {}, 0]
+        else:
+            self.coalesced += 1
+        op[2].setdefault(operator, {}).update(fields)
+        self._start()
+        if len(self.pending) >= self.batch:
+            self.wake.set()
+
+    def set(self, collection, query: dict, fields: dict):
+        self._queue(collection, query, "$set", fields)
+
+    def insert(self, collection, query: dict):
+        # Upsert that only writes on insert, so there is no need to look
+        # the document up first.
+        self._queue(collection, query, "$setOnInsert", query)
+
+    def _start(self):
+        if self.task and not self.task.done():
+            return
+        self.wake = asyncio.Event()
+        self.lock = asyncio.Lock()
+        self.task = asyncio.create_task(self._worker())
+
+    async def _worker(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self.pending:
+            return
+        async with self.lock:
+            pending, self.pending = self.pending, {}
+            grouped = {}
+            for key, (collection, query, update, _) in pending.items():
+                grouped.setdefault(collection.name, (collection, []))[1].append(
+                    (key, UpdateOne(query, update, upsert=True))
+                )
+            for collection, ops in grouped.values():
+                try:
+                    await collection.bulk_write(
+                        [op for _, op in ops], ordered=False
+                    )
+                    failed = []
+                except BulkWriteError as e:
+                    # Unordered, so everything but the listed writes went through.
+                    errors = e.details.get("writeErrors", [])
+                    failed = [ops[error["index"]][0] for error in errors]
+                    reason = errors[0].get("errmsg") if errors else e
+                except Exception as e:
+                    failed = [key for key, _ in ops]
+                    reason = e
+                self.flushed += len(ops) - len(failed)
+                if not failed:
+                    continue
+                self.failed += len(failed)
+                LOGGER(__name__).warning(
+                    f"Failed to flush {len(failed)} writes to {collection.name}: {reason}"
+                )
+                for key in failed:
+                    self._requeue(key, pending[key])
+
+    def _requeue(self, key, op: list):
+        collection, query, update, attempts = op
+        attempts += 1
+        if attempts > self.retries:
+            self.dropped += 1
+            LOGGER(__name__).error(
+                f"Dropping write to {collection.name} {query} after {attempts} attempts: {update}"
+            )
+            return
+        newer = self.pending.get(key)
+        if newer is None:
+            self.pending[key] = [collection, query, update, attempts]
+            return
+        # A newer write to the same document was queued meanwhile, keep its
+        # values and add the failed fields underneath.
+        for operator, fields in update.items():
+            newer[2][operator] = {**fields, **newer[2].get(operator, {})}
+        newer[3] = max(newer[3], attempts)
+
+    async def close(self):
+        if not self.task:
+            return
+        # Cancel only between flushes so no batch is dropped half way.
+        async with self.lock:
+            self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "flushed": self.flushed,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+writes = WriteBehind(
+    config.WRITE_BEHIND_INTERVAL,
+    config.WRITE_BEHIND_BATCH,
+    config.WRITE_BEHIND_RETRIES,
+)
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+
+import config
+
+from ..logging import LOGGER
+
+
+class YtdlpPool:
+    """
+    Bounded worker pool for blocking yt-dlp calls.
+
+    Jobs wait in line for a free worker, get a timeout, and are cancelled
+    through a progress hook when the waiting coroutine gives up on them.
+    A worker slot is only freed once its thread is done, so a timed out job
+    that is still running (extract_info cannot be interrupted) keeps its slot.
+    """
+
+    def __init__(self, workers: int, timeout: int):
+        self.workers = workers
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ytdlp"
+        )
+        self.semaphore = asyncio.Semaphore(workers)
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.busy_time = 0.0
+
+    async def _run(self, job, timeout=None):
+        cancel = threading.Event()
+        self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.running += 1
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        future = self.executor.submit(job, cancel)
+        future.add_done_callback(
+            lambda _: self._threadsafe(loop, self._release, start)
+        )
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.completed += 1
+            return result
+        finally:
+            cancel.set()
+
+    @staticmethod
+    def _threadsafe(loop, callback, *args):
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop is already closed on shutdown.
+            pass
+
+    def _release(self, start: float):
+        self.running -= 1
+        self.busy_time += time.monotonic() - start
+        self.semaphore.release()
+
+    @staticmethod
+    def _options(opts: dict, cancel: threading.Event) -> dict:
+        def hook(_):
+            if cancel.is_set():
+                raise DownloadCancelled()
+
+        opts = dict(opts)
+        opts["progress_hooks"] = list(opts.get("progress_hooks", [])) + [hook]
+        return opts
+
+    async def extract_info(self, opts: dict, url: str, download: bool = False, timeout=None):
+        def job(cancel):
+            with yt_dlp.YoutubeDL(self._options(opts, cancel)) as ydl:
+                return ydl.extract_info(url, download=download)
+
+        return await self._run(job, timeout)
+
+    async def download(self, opts: dict, urls: list, timeout=None):
+        def job(cancel):
+            with yt_dlp.YoutubeDL(self._options(opts, cancel)) as ydl:
+                return ydl.download(urls)
+
+        return await self._run(job, timeout)
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed + self.timed_out + self.cancelled
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "avg_time": round(self.busy_time / finished, 2) if finished else 0,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        LOGGER(__name__).info("yt-dlp Worker Pool Stopped.")
+
+
+ytdlp = YtdlpPool(config.YTDLP_WORKERS, config.YTDLP_TIMEOUT)
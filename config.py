@@ -61,6 +61,39 @@ SPOTIFY_CLIENT_SECRET = getenv("SPOTIFY_CLIENT_SECRET", "709e1a2969664491b582008
 
 # Maximum limit for fetching playlist's track from youtube, spotify, apple links.
 PLAYLIST_FETCH_LIMIT = int(getenv("PLAYLIST_FETCH_LIMIT", 25))
+# Number of playlist entries looked up on youtube at the same time.
+PLAYLIST_RESOLVE_WORKERS = int(getenv("PLAYLIST_RESOLVE_WORKERS", 5))
+
+# Download the next queued tracks in the background while the current one plays.
+PREFETCH_TRACKS = int(getenv("PREFETCH_TRACKS", 2))
+PREFETCH_WORKERS = int(getenv("PREFETCH_WORKERS", 3))
+# Upper bound (in bytes) for prefetched files that are still waiting in a queue.
+PREFETCH_DISK_LIMIT = int(getenv("PREFETCH_DISK_LIMIT", 1073741824))
+# Size (in bytes) assumed for a download in progress until prefetched files give an average.
+PREFETCH_ESTIMATE = int(getenv("PREFETCH_ESTIMATE", 10485760))
+
+# Worker threads for yt-dlp extraction/downloads and the per-job timeout in seconds.
+YTDLP_WORKERS = int(getenv("YTDLP_WORKERS", 4))
+YTDLP_TIMEOUT = int(getenv("YTDLP_TIMEOUT", 600))
+
+# Play youtube audio straight from its media url while the file downloads in the background.
+DIRECT_STREAM = bool(getenv("DIRECT_STREAM", False))
+# How long a resolved media url is reused when youtube does not say when it expires.
+STREAM_URL_TTL = int(getenv("STREAM_URL_TTL", 3600))
+
+# Cookies that fail this many times in a row are rested for COOKIE_COOLDOWN seconds (doubling on repeat).
+COOKIE_FAILURE_LIMIT = int(getenv("COOKIE_FAILURE_LIMIT", 2))
+COOKIE_COOLDOWN = int(getenv("COOKIE_COOLDOWN", 300))
+
+# Broadcast speed (messages per second) and parallel senders, assistants send at their own slower rate.
+BROADCAST_RATE = float(getenv("BROADCAST_RATE", 20))
+BROADCAST_WORKERS = int(getenv("BROADCAST_WORKERS", 20))
+ASSISTANT_BROADCAST_RATE = float(getenv("ASSISTANT_BROADCAST_RATE", 0.33))
+# Ban/unban calls per second and parallel workers for gban/ungban.
+GBAN_RATE = float(getenv("GBAN_RATE", 20))
+GBAN_WORKERS = int(getenv("GBAN_WORKERS", 10))
+# Chats asking for a longer FloodWait than this (seconds) are given up on.
+FANOUT_MAX_FLOOD = int(getenv("FANOUT_MAX_FLOOD", 200))
 
 
 # Telegram audio and video file size limit (in bytes)
@@ -73,6 +106,47 @@ PRIVATE_BOT_MODE_MEM = int(getenv("PRIVATE_BOT_MODE_MEM", 1))
 
 CACHE_DURATION = int(getenv("CACHE_DURATION" , "86400"))  #60*60*24
 CACHE_SLEEP = int(getenv("CACHE_SLEEP" , "3600"))   #60*60
+# Disk budget (in bytes) for downloads/, least recently played files are removed first.
+MEDIA_STORE_LIMIT = int(getenv("MEDIA_STORE_LIMIT", 2147483648))
+# "live" applies speed changes through ffmpeg filters at once, "render" plays re-encoded variants.
+SPEED_MODE = getenv("SPEED_MODE", "live").lower()
+# ffprobe processes run at the same time and the timeout (in seconds) of a single probe.
+PROBE_WORKERS = int(getenv("PROBE_WORKERS", 4))
+PROBE_TIMEOUT = int(getenv("PROBE_TIMEOUT", 60))
+# Speed variants are rendered by SPEED_WORKERS ffmpeg processes into playback/, kept under
+# SPEED_CACHE_LIMIT bytes, and played once SPEED_RENDER_LEAD seconds past the position are ready.
+SPEED_WORKERS = int(getenv("SPEED_WORKERS", 2))
+SPEED_CACHE_LIMIT = int(getenv("SPEED_CACHE_LIMIT", 1073741824))
+SPEED_RENDER_LEAD = int(getenv("SPEED_RENDER_LEAD", 15))
+
+
+# Shared HTTP client used by the platforms for API calls and file downloads.
+HTTP_CONNECTION_LIMIT = int(getenv("HTTP_CONNECTION_LIMIT", 100))
+HTTP_LIMIT_PER_HOST = int(getenv("HTTP_LIMIT_PER_HOST", 20))
+HTTP_DNS_CACHE_TTL = int(getenv("HTTP_DNS_CACHE_TTL", 300))
+HTTP_KEEPALIVE_TIMEOUT = int(getenv("HTTP_KEEPALIVE_TIMEOUT", 30))
+HTTP_CONNECT_TIMEOUT = int(getenv("HTTP_CONNECT_TIMEOUT", 10))
+HTTP_TIMEOUT = int(getenv("HTTP_TIMEOUT", 300))
+
+# YouTube search/details results cache. Set YT_CACHE_MONGO to keep entries across restarts.
+YT_CACHE_TTL = int(getenv("YT_CACHE_TTL", 21600))
+YT_CACHE_SIZE = int(getenv("YT_CACHE_SIZE", 5000))
+YT_CACHE_MONGO = bool(getenv("YT_CACHE_MONGO", False))
+
+# Thumbnails are rendered in THUMB_WORKERS processes and saved as "jpeg" or "webp".
+THUMB_WORKERS = int(getenv("THUMB_WORKERS", 2))
+THUMB_FORMAT = getenv("THUMB_FORMAT", "jpeg").lower()
+THUMB_QUALITY = int(getenv("THUMB_QUALITY", 85))
+THUMB_MAX_WIDTH = int(getenv("THUMB_MAX_WIDTH", 1280))
+# Disk budget (in bytes) for rendered thumbnails in cache/thumbs/, sent ones are reused by their telegram file_id.
+THUMB_CACHE_LIMIT = int(getenv("THUMB_CACHE_LIMIT", 209715200))
+
+# Settings writes are merged in memory and sent to mongo every WRITE_BEHIND_INTERVAL seconds
+# or as soon as WRITE_BEHIND_BATCH documents are waiting.
+WRITE_BEHIND_INTERVAL = float(getenv("WRITE_BEHIND_INTERVAL", 2))
+WRITE_BEHIND_BATCH = int(getenv("WRITE_BEHIND_BATCH", 500))
+# Flushes a failed write is retried in before it is logged and dropped.
+WRITE_BEHIND_RETRIES = int(getenv("WRITE_BEHIND_RETRIES", 5))
 
 
 # Get your pyrogram v2 session from @StringFatherBot on Telegram
@@ -89,7 +163,6 @@ lyrical = {}
 votemode = {}
 autoclean = []
 confirmer = {}
-file_cache: dict[str, float] = {}
 
 START_IMG_URL = ["https://files.catbox.moe/r8q8o0.jpg",
                  "https://files.catbox.moe/r8q8o0.jpg"